@@ -1,19 +1,33 @@
+import asyncio
 import gradio as gr
 import os
+import threading
 from dotenv import load_dotenv
 from data_processor import DataProcessor
 from chatbot_engine import EnhancedFetiiChatbot
-from visualizations import create_visualizations
+from response_cache import ResponseCache
+from single_flight import SingleFlight
+from session_store import SessionStore
+from figure_cache import FigureCache
+from visualizations import get_figure, get_figures
 import config
 import utils
 
 # Load environment variables
 load_dotenv()
 
-# Global data processors and chatbot
+# Global data processor and chatbot configuration; conversation state is per session
 data_processor = DataProcessor()
+response_cache = ResponseCache()  # shared so answers survive chatbot re-initialization
+single_flight = SingleFlight()  # shared so identical concurrent questions are answered once
+sessions = SessionStore()
+figure_cache = FigureCache()
 chatbot = None
 
+# Charts of the Analytics Dashboard tab, in display order
+DASHBOARD_CHARTS = ['hourly_distribution', 'group_size_distribution', 'popular_locations', 'time_heatmap']
+ALL_LOCATIONS = "All locations"
+
 def initialize_chatbot(api_key=None, use_ai=True):
     """Initialize or update the chatbot with new configuration."""
     global chatbot
@@ -26,29 +40,55 @@ def initialize_chatbot(api_key=None, use_ai=True):
     chatbot = EnhancedFetiiChatbot(
         data_processor,
         use_ai=use_ai and bool(gemini_api_key),
-        gemini_api_key=gemini_api_key
+        gemini_api_key=gemini_api_key,
+        response_cache=response_cache,
+        single_flight=single_flight
     )
+    sessions.clear()
     
     return chatbot
 
+async def get_session_chatbot(request: gr.Request):
+    """Get the chatbot holding this browser session's conversation."""
+    if not chatbot:
+        await asyncio.to_thread(initialize_chatbot)
+    
+    base_chatbot = chatbot
+    session_id = request.session_hash if request is not None else None
+    return sessions.get(session_id, base_chatbot.new_session)
+
 def get_ai_status():
     """Get current AI status for display."""
+    if chatbot and chatbot.use_ai and chatbot.gemini_api_key and \
+            chatbot.gemini_client.health.status(chatbot.gemini_api_key) is None:
+        return "⏳ Connecting to Gemini AI - Pattern-based Mode"
     if chatbot and hasattr(chatbot, 'ai_available') and chatbot.ai_available:
+        if chatbot.gemini_client.breaker.state != 'closed':
+            return "⏸️ Gemini AI Cooling Down - Pattern-based Mode"
         return "✅ Gemini AI Active"
     else:
         return "⚠️ Pattern-based Mode"
 
-def chat_response(message, history):
+async def chat_response(message, history, request: gr.Request):
     """Handle chat interactions with the Fetii AI chatbot."""
-    if not chatbot:
-        initialize_chatbot()
+    session_chatbot = await get_session_chatbot(request)
     
     try:
-        response = chatbot.process_query(message)
+        response = await session_chatbot.process_query_async(message)
         return response
     except Exception as e:
         return f"I encountered an error processing your request. Please try asking about Austin rideshare data patterns, locations, or statistics."
 
+async def chat_response_stream(message, history, request: gr.Request):
+    """Handle chat interactions, rendering the response as it streams in."""
+    session_chatbot = await get_session_chatbot(request)
+    
+    try:
+        async for partial_response in session_chatbot.stream_query(message):
+            yield partial_response
+    except Exception as e:
+        yield f"I encountered an error processing your request. Please try asking about Austin rideshare data patterns, locations, or statistics."
+
 def update_configuration(api_key, use_ai_enabled):
     """Update chatbot configuration and return status."""
     try:
@@ -56,13 +96,15 @@ def update_configuration(api_key, use_ai_enabled):
         status = get_ai_status()
         
         if api_key and use_ai_enabled:
+            if status.startswith("⏳"):
+                return f"⏳ Checking your Gemini API key in the background. {status}", status
             if chatbot.ai_available:
                 return f"✅ Configuration updated successfully! {status}", status
             else:
                 return f"❌ Failed to connect to Gemini AI. Check your API key. {get_ai_status()}", get_ai_status()
         else:
             return f"⚠️ Using pattern-based responses. {status}", status
-            
+    
     except Exception as e:
         return f"❌ Configuration error: {str(e)}", "❌ Configuration Error"
 
@@ -90,12 +132,46 @@ def get_top_locations():
     
     return locations_text
 
+def load_charts(*names):
+    """Build a tab's charts on first view; later views are served from the figure cache."""
+    figures = [get_figure(data_processor, name, figure_cache) for name in names]
+    return figures[0] if len(figures) == 1 else figures
+
+def get_location_choices():
+    """Get the busiest pickup and drop-off locations for the dashboard location filter."""
+    insights = data_processor.get_quick_insights()
+    locations = [location for location, _ in list(insights['top_pickups']) + list(insights['top_dropoffs'])]
+    return [ALL_LOCATIONS] + list(dict.fromkeys(locations))
+
+def get_dashboard_filters(start_date, end_date, min_group, max_group, location):
+    """Turn the dashboard filter controls into aggregate filters, leaving out the ones at their defaults."""
+    filters = {}
+    if start_date or end_date:
+        filters['date_range'] = (start_date or None, end_date or None)
+    if min_group and min_group > config.VALIDATION_RULES['min_passengers']:
+        filters['min_passengers'] = int(min_group)
+    if max_group and max_group < config.VALIDATION_RULES['max_passengers']:
+        filters['max_passengers'] = int(max_group)
+    if location and location != ALL_LOCATIONS:
+        filters['location'] = location
+    return filters
+
+def filter_dashboard(start_date, end_date, min_group, max_group, location, fingerprints):
+    """Render the dashboard charts for the chosen filters, leaving charts whose inputs did not change as shown."""
+    filters = get_dashboard_filters(start_date, end_date, min_group, max_group, location)
+    figures, fingerprints = get_figures(data_processor, DASHBOARD_CHARTS, figure_cache, filters, skip=fingerprints)
+    return [gr.update() if figures[name] is None else figures[name] for name in DASHBOARD_CHARTS] + [fingerprints]
+
 def create_main_interface():
     """Create the main Gradio interface."""
     
     # Initialize chatbot on startup
     initialize_chatbot()
     
+    # Pre-aggregate the trips for dashboard filtering off the request path (streaming mode has no trips to filter)
+    if data_processor.has_trip_table:
+        threading.Thread(target=data_processor.get_trip_cells, name='dashboard-cells', daemon=True).start()
+    
     with gr.Blocks(title="Fetii AI Assistant - Austin Rideshare Analytics", theme=gr.themes.Soft()) as demo:
         
         # Header
@@ -122,7 +198,7 @@ def create_main_interface():
                         
                         # Main chat interface
                         chatbot_interface = gr.ChatInterface(
-                            fn=chat_response,
+                            fn=chat_response_stream if config.GEMINI_CONFIG['stream_responses'] else chat_response,
                             textbox=gr.Textbox(placeholder="Ask me about Austin rideshare patterns...", scale=7),
                             title="",
                             description="",
@@ -133,7 +209,8 @@ def create_main_interface():
                                 "How do group sizes vary?"
                             ],
                             cache_examples=False,
-                            type="messages"
+                            type="messages",
+                            concurrency_limit=None
                         )
                         
                         # Button functions
@@ -151,48 +228,77 @@ def create_main_interface():
                         gr.Markdown("### Top Pickup Spots")
                         locations_display = gr.Markdown(get_top_locations())
             
-            # Analytics Dashboard Tab
-            with gr.TabItem("Analytics Dashboard"):
+            # Analytics Dashboard Tab (charts are rendered when the tab is first opened or a filter changes)
+            with gr.TabItem("Analytics Dashboard") as dashboard_tab:
                 gr.Markdown("## Interactive Analytics Dashboard")
                 gr.Markdown("Explore detailed visualizations and trends")
                 
-                # Get visualizations
-                viz = create_visualizations(data_processor)
+                # Streaming mode keeps only the running aggregates, which cannot be filtered
+                filters_enabled = data_processor.has_trip_table
+                if not filters_enabled:
+                    gr.Markdown(f"⚠️ {config.ERROR_MESSAGES['filters_unavailable']}")
+                
+                with gr.Row():
+                    start_date = gr.DateTime(label="From", include_time=False, type="string", interactive=filters_enabled)
+                    end_date = gr.DateTime(label="To", include_time=False, type="string", interactive=filters_enabled)
+                    min_group = gr.Slider(config.VALIDATION_RULES['min_passengers'], config.VALIDATION_RULES['max_passengers'],
+                                          value=config.VALIDATION_RULES['min_passengers'], step=1, label="Min Group Size",
+                                          interactive=filters_enabled)
+                    max_group = gr.Slider(config.VALIDATION_RULES['min_passengers'], config.VALIDATION_RULES['max_passengers'],
+                                          value=config.VALIDATION_RULES['max_passengers'], step=1, label="Max Group Size",
+                                          interactive=filters_enabled)
+                    location_filter = gr.Dropdown(choices=get_location_choices(), value=ALL_LOCATIONS,
+                                                  allow_custom_value=True, label="Location", interactive=filters_enabled)
+                
+                # Input fingerprints of the charts on screen, so unchanged charts are not re-sent
+                dashboard_fingerprints = gr.State({})
                 
                 with gr.Row():
                     with gr.Column():
                         gr.Markdown("### Peak Hours Analysis")
-                        gr.Plot(value=viz['hourly_distribution'])
+                        hourly_plot = gr.Plot()
                         
                         gr.Markdown("### Group Size Distribution")
-                        gr.Plot(value=viz['group_size_distribution'])
+                        group_size_plot = gr.Plot()
                     
                     with gr.Column():
                         gr.Markdown("### Popular Locations")
-                        gr.Plot(value=viz['popular_locations'])
+                        locations_plot = gr.Plot()
                         
                         gr.Markdown("### Time Heatmap")
-                        gr.Plot(value=viz['time_heatmap'])
+                        heatmap_plot = gr.Plot()
+            
+            filter_inputs = [start_date, end_date, min_group, max_group, location_filter, dashboard_fingerprints]
+            dashboard_outputs = [hourly_plot, group_size_plot, locations_plot, heatmap_plot, dashboard_fingerprints]
+            dashboard_tab.select(filter_dashboard, inputs=filter_inputs, outputs=dashboard_outputs)
+            for filter_control in filter_inputs[:-1]:
+                filter_control.change(filter_dashboard, inputs=filter_inputs, outputs=dashboard_outputs)
             
             # Advanced Analytics Tab
-            with gr.TabItem("Advanced Analytics"):
+            with gr.TabItem("Advanced Analytics") as advanced_tab:
                 gr.Markdown("## Advanced Analytics & Insights")
                 gr.Markdown("Deep dive into complex patterns")
                 
                 with gr.Row():
                     with gr.Column():
                         gr.Markdown("### Daily Volume Trends")
-                        gr.Plot(value=viz['daily_volume'])
+                        daily_volume_plot = gr.Plot()
                         
                         gr.Markdown("### Peak Patterns by Group")
-                        gr.Plot(value=viz['peak_patterns'])
+                        peak_patterns_plot = gr.Plot()
                     
                     with gr.Column():
                         gr.Markdown("### Distance Analysis")
-                        gr.Plot(value=viz['trip_distance_analysis'])
+                        distance_plot = gr.Plot()
                         
                         gr.Markdown("### Location Comparison")
-                        gr.Plot(value=viz['location_comparison'])
+                        comparison_plot = gr.Plot()
+            
+            advanced_tab.select(
+                lambda: load_charts('daily_volume', 'peak_patterns',
+                                    'trip_distance_analysis', 'location_comparison'),
+                outputs=[daily_volume_plot, peak_patterns_plot, distance_plot, comparison_plot]
+            )
         
         # Footer
         gr.Markdown("---")
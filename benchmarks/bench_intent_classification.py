@@ -0,0 +1,95 @@
+"""
+Benchmark chatbot intent classification in classifications per second.
+
+Builds a corpus from the example questions plus seeded random chat-like
+queries, then times EnhancedFetiiChatbot._parse_query (precompiled per-intent
+regexes) against the original per-pattern re.search loop, checking that both
+classify every query the same way.
+
+    python benchmarks/bench_intent_classification.py --queries 2000
+"""
+
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from data_processor import DataProcessor
+from chatbot_engine import EnhancedFetiiChatbot
+
+
+WORDS = ['hi', 'hello', 'how', 'are', 'you', 'many', 'groups', 'went', 'to', 'from', 'the', 'aquarium',
+         'last', 'month', '?', 'peak', 'hours', 'busiest', 'time', 'large', 'group', 'of', '8', 'riders',
+         'passengers', 'top', 'pickup', 'drop-off', 'spots', 'most', 'popular', 'locations', 'summary',
+         'overview', 'give', 'me', 'show', 'stats', 'total', 'trips', 'tell', 'about', 'west', 'campus',
+         'when', 'do', 'ride', 'what', 'thanks', 'help', 'good', 'hottest', 'group size', 'stats for']
+
+
+def build_corpus(size: int, seed: int = 0) -> list:
+    """Example questions first, then random chat-like queries up to the given size."""
+    rng = random.Random(seed)
+    corpus = list(config.CHATBOT_CONFIG['example_questions'])
+    while len(corpus) < size:
+        corpus.append(' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 12))))
+    return corpus[:size]
+
+
+def loop_parse_query(query_patterns: dict, query: str):
+    """The original _parse_query: one re.search per pattern, in priority order."""
+    for intent, patterns in query_patterns.items():
+        for pattern in patterns:
+            match = re.search(pattern, query, re.IGNORECASE)
+            if not match:
+                continue
+            
+            if intent != 'location_stats':
+                return intent, {}
+            
+            location = match.group(1).strip()
+            if location:
+                return intent, {'location': location}
+    
+    return 'general_stats', {}
+
+
+def throughput(classify, corpus: list, repeat: int) -> float:
+    """Best classifications per second over repeat passes of the corpus."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for query in corpus:
+            classify(query)
+        best = min(best, time.perf_counter() - start)
+    return len(corpus) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    
+    bot = EnhancedFetiiChatbot(DataProcessor(), use_ai=False)
+    corpus = [query.lower() for query in build_corpus(args.queries)]
+    
+    for query in corpus:
+        assert bot._parse_query(query) == loop_parse_query(bot.query_patterns, query), query
+    
+    results = {
+        'per-pattern loop': throughput(lambda query: loop_parse_query(bot.query_patterns, query),
+                                       corpus, args.repeat),
+        'precompiled _parse_query': throughput(bot._parse_query, corpus, args.repeat)
+    }
+    
+    print(f"\n{len(corpus):,} queries, best of {args.repeat}")
+    for name, rate in results.items():
+        print(f"{name:28s} {rate:>10,.0f} classifications/s")
+
+
+if __name__ == '__main__':
+    main()
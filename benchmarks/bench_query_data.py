@@ -0,0 +1,128 @@
+"""
+Benchmark DataProcessor.query_data on a synthetic trip table.
+
+Resamples the shipped trips up to --rows rows, spreads them over --days days
+with random times and group sizes, and times each query through the trip index
+against the per-call pandas scan that query_data used before the index.
+The table uses the compact schema, which keeps 10M rows within a few GB.
+
+    python benchmarks/bench_query_data.py --rows 10000000
+"""
+
+import os
+import sys
+import time
+import argparse
+import datetime
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_processor import DataProcessor, DAY_NAMES, _map_unique
+
+
+QUERIES = {
+    'campus, night, 8+, one week': {'pickup_location': 'campus', 'hour_range': (21, 23), 'min_passengers': 8,
+                                    'date_range': (datetime.date(2025, 3, 1), datetime.date(2025, 3, 7))},
+    'dropoff Aquarium, 0-3h': {'dropoff_location': 'Aquarium', 'hour_range': (0, 3)},
+    '12+ passengers': {'min_passengers': 12},
+    'one day': {'date_range': (datetime.date(2025, 3, 5), datetime.date(2025, 3, 5))},
+    'pickup Sixth Street, one day': {'pickup_location': 'Sixth Street',
+                                     'date_range': (datetime.date(2025, 3, 5), datetime.date(2025, 3, 5))},
+    'medium groups, evening': {'min_passengers': 5, 'max_passengers': 8, 'hour_range': (17, 20)}
+}
+
+
+def synthetic_trips(dp: DataProcessor, rows: int, days: int, seed: int = 0) -> pd.DataFrame:
+    """Resample the processed trips to the given size with random timestamps and group sizes."""
+    rng = np.random.default_rng(seed)
+    df = dp.df.iloc[rng.integers(0, len(dp.df), rows)].reset_index(drop=True)
+    
+    start = pd.Timestamp('2025-01-01')
+    df['datetime'] = start + pd.to_timedelta(rng.integers(0, days * 24 * 60, rows), unit='min')
+    df['hour'] = df['datetime'].dt.hour
+    df['day_of_week'] = pd.Categorical.from_codes(df['datetime'].dt.dayofweek, DAY_NAMES)
+    df['time_category'] = _map_unique(df['hour'], dp._categorize_time)
+    
+    df['Total Passengers'] = rng.integers(1, 15, rows)
+    df['group_category'] = _map_unique(df['Total Passengers'], dp._categorize_group_size)
+    
+    return dp._compact_frame(df)
+
+
+def scan_query(df: pd.DataFrame, query_params: dict) -> pd.DataFrame:
+    """The per-call pandas scan query_data ran before the trip index."""
+    filtered_df = df.copy()
+    
+    if 'pickup_location' in query_params:
+        filtered_df = filtered_df[filtered_df['pickup_main'].str.contains(
+            query_params['pickup_location'], case=False, na=False)]
+    
+    if 'dropoff_location' in query_params:
+        filtered_df = filtered_df[filtered_df['dropoff_main'].str.contains(
+            query_params['dropoff_location'], case=False, na=False)]
+    
+    if 'hour_range' in query_params:
+        start_hour, end_hour = query_params['hour_range']
+        filtered_df = filtered_df[
+            (filtered_df['hour'] >= start_hour) & (filtered_df['hour'] <= end_hour)]
+    
+    if 'min_passengers' in query_params:
+        filtered_df = filtered_df[filtered_df['Total Passengers'] >= query_params['min_passengers']]
+    
+    if 'max_passengers' in query_params:
+        filtered_df = filtered_df[filtered_df['Total Passengers'] <= query_params['max_passengers']]
+    
+    if 'date_range' in query_params:
+        start_date, end_date = query_params['date_range']
+        start_date, end_date = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        filtered_df = filtered_df[
+            (filtered_df['date'] >= start_date) & (filtered_df['date'] <= end_date)]
+    
+    return filtered_df
+
+
+def best_of(repeat: int, func, *args):
+    """Run func repeat times and return (best seconds, last result)."""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--no-scan', action='store_true', help='skip the pandas scan baseline')
+    args = parser.parse_args()
+    
+    dp = DataProcessor(use_snapshot=False, compact_schema=True, streaming=False)
+    
+    start = time.perf_counter()
+    df = synthetic_trips(dp, args.rows, args.days)
+    print(f"generated {len(df):,} trips in {time.perf_counter() - start:.1f}s")
+    
+    dp.df = df
+    dp.data_version += 1
+    start = time.perf_counter()
+    dp.get_trip_index()
+    print(f"trip index built in {time.perf_counter() - start:.1f}s")
+    
+    print(f"\n{'query':32s} {'rows':>10s} {'indexed ms':>11s} {'scan ms':>10s} {'speedup':>8s}")
+    for name, query_params in QUERIES.items():
+        indexed, result = best_of(args.repeat, dp.query_data, query_params)
+        line = f"{name:32s} {len(result):>10,d} {indexed * 1000:>11.1f}"
+        if not args.no_scan:
+            scanned, expected = best_of(1, scan_query, df, query_params)
+            assert result.index.equals(expected.index), name
+            line += f" {scanned * 1000:>10.1f} {scanned / indexed:>7.0f}x"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
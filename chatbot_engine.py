@@ -1,23 +1,52 @@
+import asyncio
+import copy
 import re
 import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+import httpx
 import requests
-from typing import Dict, List, Any, Tuple, Optional
+from typing import Dict, List, Any, Tuple, Optional, AsyncIterator
 from data_processor import DataProcessor
+from response_cache import ResponseCache, normalize_query
+from gemini_client import GeminiClient, get_shared_client
+from single_flight import FlightAbandoned, SingleFlight
+import config
 import utils
 
+# Intents answered without any trip data
+SMALL_TALK_INTENTS = ('greetings', 'casual_conversation')
+
+ERROR_RESPONSE = ("I'm having a bit of trouble processing that request. "
+                  "Let me help you explore Austin rideshare data - try asking about specific locations, "
+                  "time patterns, or group sizes. What would you like to discover?")
+
+# Bounded pool for the CPU-bound parts of async chat requests
+_data_executor = ThreadPoolExecutor(max_workers=config.GEMINI_CONFIG['data_workers'],
+                                    thread_name_prefix='fetii-data')
+
+# Blocking Gemini calls raced against the pattern answer in the synchronous path
+_gemini_executor = ThreadPoolExecutor(max_workers=config.GEMINI_CONFIG['pool_maxsize'],
+                                      thread_name_prefix='fetii-gemini')
+
 class EnhancedFetiiChatbot:
     """
     Enhanced conversational chatbot with Google Gemini AI integration for Fetii rideshare data analysis.
     Falls back to pattern-based responses when AI is unavailable.
     """
     
-    def __init__(self, data_processor: DataProcessor, use_ai: bool = True, gemini_api_key: str = None):
+    def __init__(self, data_processor: DataProcessor, use_ai: bool = True, gemini_api_key: str = None,
+                 response_cache: Optional[ResponseCache] = None, gemini_client: Optional[GeminiClient] = None,
+                 single_flight: Optional[SingleFlight] = None):
         """Initialize the enhanced chatbot with Gemini AI capabilities."""
         self.data_processor = data_processor
-        self.conversation_history = []
+        self.response_cache = response_cache if response_cache is not None else ResponseCache()
+        self.single_flight = single_flight if single_flight is not None else SingleFlight()
+        self.gemini_client = gemini_client if gemini_client is not None else get_shared_client()
+        self.conversation_history = deque(maxlen=config.CHATBOT_CONFIG['max_history'])
         self.use_ai = use_ai
         self.gemini_api_key = gemini_api_key
-        self.ai_available = False
         
         # Initialize Gemini AI if API key provided
         if self.use_ai and self.gemini_api_key:
@@ -70,142 +99,356 @@ class EnhancedFetiiChatbot:
                 r'total trips'
             ]
         }
+        
+        # Compiled once so classification never goes through the re module cache
+        self._intent_regexes = self._compile_intent_regexes()
+    
+    @property
+    def ai_available(self) -> bool:
+        """Check whether AI answers are enabled and the key has passed its background health check."""
+        return bool(self.use_ai and self.gemini_api_key
+                    and self.gemini_client.health.status(self.gemini_api_key))
     
     def _setup_gemini(self):
-        """Setup Gemini AI connection."""
+        """Start the background Gemini health check; pattern mode serves until it succeeds."""
+        self.gemini_client.health.status(self.gemini_api_key)
+    
+    def process_query(self, user_query: str) -> str:
+        """Process a user query and return an appropriate response."""
+        started_at = time.monotonic()
+        user_query = user_query.strip()
+        
+        self.conversation_history.append({"role": "user", "content": user_query})
+        
         try:
-            # Test Gemini API connection with minimal request
-            test_payload = {
-                "contents": [
-                    {
-                        "parts": [
-                            {"text": "Hi"}
-                        ]
-                    }
-                ],
-                "generationConfig": {
-                    "temperature": 0.7,
-                    "maxOutputTokens": 10
-                }
-            }
+            normalized_query = normalize_query(user_query)
+            data_version = self.data_processor.data_version
+            
+            cached_response = self._get_cached_response(normalized_query, data_version)
+            if cached_response is not None:
+                return self._record_response(cached_response)
             
-            response = requests.post(
-                f'https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash-latest:generateContent?key={self.gemini_api_key}',
-                headers={'Content-Type': 'application/json'},
-                json=test_payload,
-                timeout=5
+            # Identical concurrent queries share one computation
+            response = self.single_flight.run(
+                self._flight_key(normalized_query, data_version),
+                lambda: self._answer_query(user_query, normalized_query, data_version, started_at)
             )
+            return self._record_response(response)
+        
+        except Exception as e:
+            return ERROR_RESPONSE
+    
+    async def process_query_async(self, user_query: str) -> str:
+        """
+        Process a user query without blocking the event loop.
+        
+        The Gemini call goes through the async HTTP client, and the CPU-bound
+        context and pattern work runs on a bounded thread pool.
+        """
+        started_at = time.monotonic()
+        user_query = user_query.strip()
+        
+        self.conversation_history.append({"role": "user", "content": user_query})
+        
+        try:
+            normalized_query = normalize_query(user_query)
+            data_version = self.data_processor.data_version
             
-            if response.status_code == 200:
-                self.ai_available = True
-                print("✅ Gemini AI connected successfully")
-            elif response.status_code == 429:
-                print("⚠️ Gemini API rate limit reached - falling back to pattern-based responses")
-                self.ai_available = False
-            elif response.status_code == 400:
-                print("⚠️ Invalid Gemini API key or request")
-                self.ai_available = False
-            else:
-                print(f"⚠️ Gemini AI connection failed: {response.status_code}")
-                self.ai_available = False
-                
+            cached_response = self._get_cached_response(normalized_query, data_version)
+            if cached_response is not None:
+                return self._record_response(cached_response)
+            
+            response = await self.single_flight.run_async(
+                self._flight_key(normalized_query, data_version),
+                lambda: self._answer_query_async(user_query, normalized_query, data_version, started_at)
+            )
+            return self._record_response(response)
+        
         except Exception as e:
-            print(f"⚠️ Failed to connect to Gemini AI: {str(e)}")
-            self.ai_available = False
+            return ERROR_RESPONSE
     
-    def process_query(self, user_query: str) -> str:
-        """Process a user query and return an appropriate response."""
+    async def stream_query(self, user_query: str) -> AsyncIterator[str]:
+        """
+        Process a user query, yielding the response text so far as Gemini streams it.
+        
+        A stream that fails partway is never cached; the pattern-based answer
+        replaces whatever partial text was already shown. Identical concurrent
+        queries wait for the leading stream and receive its final answer.
+        """
+        started_at = time.monotonic()
         user_query = user_query.strip()
         
         self.conversation_history.append({"role": "user", "content": user_query})
         
         try:
-            # Get relevant data context
-            context = self._get_data_context(user_query)
+            normalized_query = normalize_query(user_query)
+            data_version = self.data_processor.data_version
             
-            # Try AI response first if available
-            if self.ai_available:
-                ai_response = self._get_gemini_response(user_query, context)
-                if ai_response:
-                    self.conversation_history.append({"role": "assistant", "content": ai_response})
-                    return ai_response
+            cached_response = self._get_cached_response(normalized_query, data_version)
+            if cached_response is not None:
+                yield self._record_response(cached_response)
+                return
             
-            # Fallback to pattern-based response
-            response = self._pattern_based_response(user_query.lower())
-            self.conversation_history.append({"role": "assistant", "content": response})
-            return response
+            flight_key = self._flight_key(normalized_query, data_version)
+            while True:
+                flight, leader = self.single_flight.begin(flight_key)
+                if leader:
+                    break
+                try:
+                    response = await self.single_flight.wait_async(flight)
+                except FlightAbandoned:
+                    # The leading stream was cancelled; retry, taking the lead if nobody else has
+                    continue
+                yield self._record_response(response)
+                return
             
+            response = None
+            try:
+                async for response in self._stream_answer(user_query, normalized_query, data_version, started_at):
+                    yield response
+            except BaseException as e:
+                self.single_flight.finish(flight_key, flight, error=e)
+                raise
+            self.single_flight.finish(flight_key, flight, response)
+            self._record_response(response)
+        
         except Exception as e:
-            error_response = ("I'm having a bit of trouble processing that request. "
-                            "Let me help you explore Austin rideshare data - try asking about specific locations, "
-                            "time patterns, or group sizes. What would you like to discover?")
-            return error_response
+            yield ERROR_RESPONSE
+    
+    def _answer_query(self, user_query: str, normalized_query: str, data_version: int, started_at: float) -> str:
+        """Compute and cache the answer to a query that missed the cache."""
+        # Classify first; context is only built when Gemini will actually be asked
+        intent, params = self._parse_query(normalized_query)
+        
+        # Try AI response first if available, racing the pattern answer under the latency budget
+        response = None
+        if self._acquire_gemini_call():
+            context = self._get_data_context(user_query, intent)
+            if self._remaining_budget(started_at) is None:
+                ai_response = self._get_gemini_response(user_query, context)
+            else:
+                ai_future = _gemini_executor.submit(self._get_gemini_response, user_query, context)
+                response = self._pattern_based_response(normalized_query, intent, params)
+                try:
+                    ai_response = ai_future.result(timeout=self._remaining_budget(started_at))
+                except FuturesTimeoutError:
+                    ai_response = None
+                    self._handle_late_answer(ai_future, normalized_query, data_version)
+            
+            if ai_response:
+                return self._cache_response(ai_response, normalized_query, 'ai', data_version)
+        
+        # Fallback to pattern-based response
+        if response is None:
+            response = self._pattern_based_response(normalized_query, intent, params)
+        return self._cache_response(response, normalized_query, 'pattern', data_version)
+    
+    async def _answer_query_async(self, user_query: str, normalized_query: str, data_version: int,
+                                  started_at: float) -> str:
+        """Compute and cache the answer to a query that missed the cache, without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        intent, params = self._parse_query(normalized_query)
+        
+        pattern_future = None
+        if self._acquire_gemini_call():
+            context = await loop.run_in_executor(_data_executor, self._get_data_context, user_query, intent)
+            ai_task = asyncio.ensure_future(self._get_gemini_response_async(user_query, context))
+            budget = self._remaining_budget(started_at)
+            if budget is not None:
+                pattern_future = loop.run_in_executor(_data_executor, self._pattern_based_response, normalized_query,
+                                                      intent, params)
+            
+            try:
+                ai_response = await asyncio.wait_for(asyncio.shield(ai_task), budget)
+            except asyncio.TimeoutError:
+                ai_response = None
+                self._handle_late_answer(ai_task, normalized_query, data_version)
+            
+            if ai_response:
+                return self._cache_response(ai_response, normalized_query, 'ai', data_version)
+        
+        if pattern_future is None:
+            pattern_future = loop.run_in_executor(_data_executor, self._pattern_based_response, normalized_query,
+                                                  intent, params)
+        response = await pattern_future
+        return self._cache_response(response, normalized_query, 'pattern', data_version)
+    
+    async def _stream_answer(self, user_query: str, normalized_query: str, data_version: int,
+                             started_at: float) -> AsyncIterator[str]:
+        """Stream and cache the answer to a query that missed the cache; the last value yielded is final."""
+        loop = asyncio.get_running_loop()
+        intent, params = self._parse_query(normalized_query)
+        
+        pattern_future = None
+        if self._acquire_gemini_call():
+            context = await loop.run_in_executor(_data_executor, self._get_data_context, user_query, intent)
+            budget = self._remaining_budget(started_at)
+            if budget is not None:
+                pattern_future = loop.run_in_executor(_data_executor, self._pattern_based_response, normalized_query,
+                                                      intent, params)
+            
+            ai_response = ''
+            completed = False
+            stream = self._stream_gemini_response(user_query, context)
+            try:
+                # Hedge on the first chunk; once text is flowing the answer stays with Gemini
+                text = await asyncio.wait_for(stream.__anext__(), budget)
+                while True:
+                    ai_response += text
+                    yield ai_response
+                    text = await stream.__anext__()
+            except StopAsyncIteration:
+                completed = True
+            except asyncio.TimeoutError:
+                print("⚠️ Gemini missed the latency budget - falling back to pattern-based response")
+                # The stream is dropped unfinished, so it must not hold a half-open trial forever
+                self.gemini_client.breaker.cancel_request()
+            except (asyncio.CancelledError, GeneratorExit):
+                self.gemini_client.breaker.cancel_request()
+                raise
+            except httpx.TimeoutException:
+                print("⚠️ Gemini API timeout - falling back to pattern-based response")
+                self.gemini_client.breaker.record_failure()
+            except Exception as e:
+                print(f"Error streaming from Gemini API: {str(e)}")
+                self.gemini_client.breaker.record_failure()
+            finally:
+                await stream.aclose()
+            
+            if completed and ai_response.strip():
+                final_response = self._cache_response(ai_response.strip(), normalized_query, 'ai', data_version)
+                if final_response != ai_response:
+                    yield final_response
+                return
+        
+        if pattern_future is None:
+            pattern_future = loop.run_in_executor(_data_executor, self._pattern_based_response, normalized_query,
+                                                  intent, params)
+        response = await pattern_future
+        yield self._cache_response(response, normalized_query, 'pattern', data_version)
+    
+    def _remaining_budget(self, started_at: float) -> Optional[float]:
+        """Get the seconds left in the latency budget, or None when hedging is off."""
+        settings = config.HEDGING_CONFIG
+        if not settings['enabled']:
+            return None
+        return max(0.0, settings['latency_budget_seconds'] - (time.monotonic() - started_at))
+    
+    def _handle_late_answer(self, ai_future, normalized_query: str, data_version: int):
+        """Keep a Gemini answer that misses the budget to warm the cache, or abandon it."""
+        print("⚠️ Gemini missed the latency budget - falling back to pattern-based response")
+        if not config.HEDGING_CONFIG['warm_cache_with_late_answers']:
+            # A cancelled call never reports its outcome, so give its breaker admission back;
+            # a call that cannot be cancelled runs to completion and reports as usual
+            if ai_future.cancel():
+                self.gemini_client.breaker.cancel_request()
+            return
+        
+        def store(future):
+            if not future.cancelled() and future.exception() is None and future.result():
+                self.response_cache.put((normalized_query, 'ai'), data_version, future.result())
+        
+        ai_future.add_done_callback(store)
+    
+    def _response_mode(self) -> str:
+        """Get the mode this chatbot currently answers in."""
+        return 'ai' if self.ai_available else 'pattern'
     
-    def _get_data_context(self, query: str) -> str:
+    def _get_cached_response(self, normalized_query: str, data_version: int) -> Optional[str]:
+        """Look up a cached answer for the current mode."""
+        return self.response_cache.get((normalized_query, self._response_mode()), data_version)
+    
+    def _flight_key(self, normalized_query: str, data_version: int) -> tuple:
+        """Key under which identical concurrent queries in the same mode share one computation."""
+        return (normalized_query, self._response_mode(), data_version)
+    
+    def _cache_response(self, response: str, normalized_query: str, mode: str, data_version: int) -> str:
+        """Cache an answer computed in the given mode against a data version."""
+        self.response_cache.put((normalized_query, mode), data_version, response)
+        return response
+    
+    def _record_response(self, response: str) -> str:
+        """Add a response to the conversation history."""
+        self.conversation_history.append({"role": "assistant", "content": response})
+        return response
+    
+    def _get_data_context(self, query: str, intent: str = None) -> str:
         """Extract relevant data context based on the query."""
-        insights = self.data_processor.get_quick_insights()
         query_lower = query.lower()
         
         # Base context always included
-        context_parts = [
-            f"Total Austin rideshare trips analyzed: {insights['total_trips']:,}",
-            f"Average group size: {insights['avg_group_size']:.1f} passengers",
-            f"Peak activity hour: {utils.format_time(insights['peak_hour'])}",
-            f"Large groups (6+): {insights['large_groups_pct']:.1f}% of all trips"
-        ]
+        context_parts = [self._context_fragment('overview')]
         
         # Add query-specific context
         if any(word in query_lower for word in ['location', 'place', 'pickup', 'dropoff', 'where', 'destination']):
+            context_parts.append(self._context_fragment('top_locations'))
+        
+        if any(word in query_lower for word in ['time', 'hour', 'peak', 'busy', 'when']):
+            context_parts.append(self._context_fragment('hourly'))
+        
+        if any(word in query_lower for word in ['group', 'size', 'passenger', 'people']):
+            context_parts.append(self._context_fragment('group_sizes'))
+        
+        # Extract specific location if mentioned; small talk never needs per-location stats
+        if intent not in SMALL_TALK_INTENTS:
+            for location in self._extract_locations_from_query(query)[:2]:  # Limit to 2 locations
+                location_part = self._location_fragment(location)
+                if location_part:
+                    context_parts.append(location_part)
+        
+        return "\n".join(context_parts)
+    
+    def _context_fragment(self, name: str) -> str:
+        """Get a formatted context fragment, built once per data version from the precomputed insights."""
+        return self.data_processor.get_derived(('context', name), lambda: self._build_context_fragment(name))
+    
+    def _build_context_fragment(self, name: str) -> str:
+        """Format one context fragment."""
+        insights = self.data_processor.get_quick_insights()
+        
+        if name == 'overview':
+            return "\n".join([
+                f"Total Austin rideshare trips analyzed: {insights['total_trips']:,}",
+                f"Average group size: {insights['avg_group_size']:.1f} passengers",
+                f"Peak activity hour: {utils.format_time(insights['peak_hour'])}",
+                f"Large groups (6+): {insights['large_groups_pct']:.1f}% of all trips"
+            ])
+        
+        if name == 'top_locations':
             top_pickups = dict(list(insights['top_pickups'])[:5])
             top_dropoffs = dict(list(insights['top_dropoffs'])[:5])
-            context_parts.extend([
-                f"Top pickup locations: {top_pickups}",
-                f"Top destinations: {top_dropoffs}"
-            ])
+            return f"Top pickup locations: {top_pickups}\nTop destinations: {top_dropoffs}"
         
-        if any(word in query_lower for word in ['time', 'hour', 'peak', 'busy', 'when']):
+        if name == 'hourly':
             time_data = self.data_processor.get_time_patterns()
             hourly_top = dict(sorted(time_data['hourly_counts'].items(), key=lambda x: x[1], reverse=True)[:5])
-            context_parts.append(f"Hourly trip distribution: {hourly_top}")
+            return f"Hourly trip distribution: {hourly_top}"
         
-        if any(word in query_lower for word in ['group', 'size', 'passenger', 'people']):
+        if name == 'group_sizes':
             group_dist = dict(list(insights['group_size_distribution'].items())[:8])
-            context_parts.append(f"Group size distribution: {group_dist}")
-        
-        # Extract specific location if mentioned
-        potential_locations = self._extract_locations_from_query(query)
-        if potential_locations:
-            for location in potential_locations[:2]:  # Limit to 2 locations
-                stats = self.data_processor.get_location_stats(location)
-                if stats['pickup_count'] > 0 or stats['dropoff_count'] > 0:
-                    context_parts.append(
-                        f"'{location}' stats: {stats['pickup_count']} pickups, "
-                        f"{stats['dropoff_count']} dropoffs"
-                    )
+            return f"Group size distribution: {group_dist}"
         
-        return "\n".join(context_parts)
+        raise KeyError(name)
+    
+    def _location_fragment(self, location: str) -> str:
+        """Get the context line for a known location, or an empty string if it has no trips."""
+        def build():
+            stats = self.data_processor.get_location_stats(location)
+            if stats['pickup_count'] > 0 or stats['dropoff_count'] > 0:
+                return (f"'{location}' stats: {stats['pickup_count']} pickups, "
+                        f"{stats['dropoff_count']} dropoffs")
+            return ''
+        
+        return self.data_processor.get_derived(('location_context', location), build)
     
     def _extract_locations_from_query(self, query: str) -> List[str]:
         """Extract potential location names from the query."""
-        # Get all known locations
-        all_pickups = self.data_processor.df['pickup_main'].unique()
-        all_dropoffs = self.data_processor.df['dropoff_main'].unique()
-        all_locations = set(list(all_pickups) + list(all_dropoffs))
-        
-        query_lower = query.lower()
-        found_locations = []
-        
-        for location in all_locations:
-            if location.lower() in query_lower:
-                found_locations.append(location)
-        
-        return found_locations
+        return self.data_processor.get_location_matcher().find(query)
     
-    def _get_gemini_response(self, query: str, context: str) -> Optional[str]:
-        """Get response from Gemini AI with improved error handling."""
-        try:
-            # Create system prompt with data context
-            system_prompt = f"""You are Fetii AI, a friendly and knowledgeable assistant specializing in Austin rideshare analytics. 
+    def _build_gemini_payload(self, query: str, context: str) -> Dict[str, Any]:
+        """Build the generateContent payload for a query and its data context."""
+        # Create system prompt with data context
+        system_prompt = f"""You are Fetii AI, a friendly and knowledgeable assistant specializing in Austin rideshare analytics. 
 
 Your personality:
 - Conversational and helpful
@@ -223,57 +466,108 @@ Important: Always use the specific numbers and data from the context above. Don'
 User query: {query}
 
 Response:"""
-            
-            payload = {
-                "contents": [
-                    {
-                        "parts": [
-                            {"text": system_prompt}
-                        ]
-                    }
-                ],
-                "generationConfig": {
-                    "temperature": 0.7,
-                    "maxOutputTokens": 200,
-                    "topP": 0.8,
-                    "topK": 40
+        
+        payload = {
+            "contents": [
+                {
+                    "parts": [
+                        {"text": system_prompt}
+                    ]
                 }
+            ],
+            "generationConfig": {
+                "temperature": 0.7,
+                "maxOutputTokens": 200,
+                "topP": 0.8,
+                "topK": 40
             }
-            
-            response = requests.post(
-                f'https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash-latest:generateContent?key={self.gemini_api_key}',
-                headers={'Content-Type': 'application/json'},
-                json=payload,
-                timeout=15
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                if 'candidates' in result and len(result['candidates']) > 0:
-                    content = result['candidates'][0]['content']['parts'][0]['text']
-                    return content.strip()
-            elif response.status_code == 429:
-                print("⚠️ Gemini API rate limit reached - falling back to pattern-based response")
-                self.ai_available = False
-                return None
-            elif response.status_code == 400:
-                print("⚠️ Invalid Gemini API request")
-                self.ai_available = False
-                return None
-            else:
-                print(f"Gemini API error: {response.status_code} - {response.text}")
-                
+        }
+        
+        return payload
+    
+    def _acquire_gemini_call(self) -> bool:
+        """Check that AI is enabled, the circuit admits a call and the rate limiter has a token."""
+        if not self.ai_available or not self.gemini_client.breaker.allow_request():
+            return False
+        if not self.gemini_client.rate_limiter.try_acquire():
+            self.gemini_client.breaker.cancel_request()
+            return False
+        return True
+    
+    def _read_gemini_response(self, response) -> Optional[str]:
+        """Extract the answer from a Gemini HTTP response, reporting the outcome to the circuit breaker."""
+        breaker = self.gemini_client.breaker
+        if response.status_code == 200:
+            breaker.record_success()
+            result = response.json()
+            if 'candidates' in result and len(result['candidates']) > 0:
+                content = result['candidates'][0]['content']['parts'][0]['text']
+                return content.strip()
+        elif response.status_code == 429:
+            print("⚠️ Gemini API rate limit reached - falling back to pattern-based response")
+            breaker.record_failure(trip=True)
+        elif response.status_code == 400:
+            print("⚠️ Invalid Gemini API request")
+            breaker.record_failure()
+        else:
+            print(f"Gemini API error: {response.status_code} - {response.text}")
+            breaker.record_failure()
+        
+        return None
+    
+    def _get_gemini_response(self, query: str, context: str) -> Optional[str]:
+        """Get response from Gemini AI with improved error handling."""
+        try:
+            payload = self._build_gemini_payload(query, context)
+            response = self.gemini_client.generate_content(self.gemini_api_key, payload)
+            return self._read_gemini_response(response)
+        
         except requests.exceptions.Timeout:
             print("⚠️ Gemini API timeout - falling back to pattern-based response")
-            return None
+            self.gemini_client.breaker.record_failure()
         except Exception as e:
             print(f"Error calling Gemini API: {str(e)}")
-            
+            self.gemini_client.breaker.record_failure()
+        
+        return None
+    
+    async def _get_gemini_response_async(self, query: str, context: str) -> Optional[str]:
+        """Get response from Gemini AI without blocking the event loop."""
+        try:
+            payload = self._build_gemini_payload(query, context)
+            response = await self.gemini_client.generate_content_async(self.gemini_api_key, payload)
+            return self._read_gemini_response(response)
+        
+        except httpx.TimeoutException:
+            print("⚠️ Gemini API timeout - falling back to pattern-based response")
+            self.gemini_client.breaker.record_failure()
+        except Exception as e:
+            print(f"Error calling Gemini API: {str(e)}")
+            self.gemini_client.breaker.record_failure()
+        
         return None
     
-    def _pattern_based_response(self, query: str) -> str:
+    async def _stream_gemini_response(self, query: str, context: str) -> AsyncIterator[str]:
+        """Yield Gemini answer text as it is generated; yields nothing on an error status."""
+        payload = self._build_gemini_payload(query, context)
+        async with self.gemini_client.stream_generate_content(self.gemini_api_key, payload) as response:
+            if response.status_code != 200:
+                await response.aread()
+                self._read_gemini_response(response)
+                return
+            
+            async for event in self.gemini_client.iter_events(response):
+                for candidate in event.get('candidates', [])[:1]:
+                    for part in candidate.get('content', {}).get('parts', []):
+                        if part.get('text'):
+                            yield part['text']
+            
+            self.gemini_client.breaker.record_success()
+    
+    def _pattern_based_response(self, query: str, query_type: str = None, params: Dict[str, Any] = None) -> str:
         """Fallback pattern-based response system."""
-        query_type, params = self._parse_query(query)
+        if query_type is None:
+            query_type, params = self._parse_query(query)
         
         if query_type == 'greetings':
             return self._handle_greetings(query)
@@ -292,47 +586,38 @@ Response:"""
         else:
             return self._handle_fallback(query)
     
+    def _compile_intent_regexes(self) -> List[Tuple[str, re.Pattern]]:
+        """
+        Compile the query patterns once, in priority order.
+        
+        Each intent's patterns are joined into one alternation, since any match is
+        enough to pick the intent. Location patterns stay separate because the first
+        pattern that matches decides which location gets captured.
+        """
+        compiled = []
+        for intent, patterns in self.query_patterns.items():
+            if intent == 'location_stats':
+                compiled.extend((intent, re.compile(pattern, re.IGNORECASE)) for pattern in patterns)
+            else:
+                alternation = '|'.join(f"(?:{pattern})" for pattern in patterns)
+                compiled.append((intent, re.compile(alternation, re.IGNORECASE)))
+        return compiled
+    
     def _parse_query(self, query: str) -> Tuple[str, Dict[str, Any]]:
         """Parse the user query to determine intent and extract parameters."""
-        params = {}
-        
-        # Check for greetings first
-        for pattern in self.query_patterns['greetings']:
-            if re.search(pattern, query, re.IGNORECASE):
-                return 'greetings', params
-        
-        # Check for casual conversation
-        for pattern in self.query_patterns['casual_conversation']:
-            if re.search(pattern, query, re.IGNORECASE):
-                return 'casual_conversation', params
-        
-        # Check for location stats
-        for pattern in self.query_patterns['location_stats']:
-            match = re.search(pattern, query, re.IGNORECASE)
-            if match:
-                location = match.group(1).strip()
-                if location:
-                    params['location'] = location
-                    return 'location_stats', params
-        
-        # Check other patterns
-        for pattern in self.query_patterns['time_patterns']:
-            if re.search(pattern, query, re.IGNORECASE):
-                return 'time_patterns', params
-        
-        for pattern in self.query_patterns['group_size']:
-            if re.search(pattern, query, re.IGNORECASE):
-                return 'group_size', params
-        
-        for pattern in self.query_patterns['top_locations']:
-            if re.search(pattern, query, re.IGNORECASE):
-                return 'top_locations', params
-        
-        for pattern in self.query_patterns['general_stats']:
-            if re.search(pattern, query, re.IGNORECASE):
-                return 'general_stats', params
-        
-        return 'general_stats', params
+        for intent, regex in self._intent_regexes:
+            match = regex.search(query)
+            if not match:
+                continue
+            
+            if intent != 'location_stats':
+                return intent, {}
+            
+            location = match.group(1).strip()
+            if location:
+                return intent, {'location': location}
+        
+        return 'general_stats', {}
     
     def _handle_greetings(self, query: str) -> str:
         """Handle greeting messages."""
@@ -430,16 +715,40 @@ Response:"""
     
     def get_conversation_history(self) -> List[Dict[str, str]]:
         """Get the conversation history."""
-        return self.conversation_history
+        return list(self.conversation_history)
+    
+    def new_session(self) -> 'EnhancedFetiiChatbot':
+        """
+        Create a chatbot for another user session with its own empty history.
+        
+        The session shares this chatbot's data processor, caches, Gemini client,
+        compiled patterns and AI settings, so no connection probe is repeated.
+        """
+        session = copy.copy(self)
+        session.conversation_history = deque(maxlen=config.CHATBOT_CONFIG['max_history'])
+        return session
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get response cache hit/miss counters."""
+        return self.response_cache.stats()
+    
+    def get_coalescing_stats(self) -> Dict[str, Any]:
+        """Get single-flight leader/coalesced counters."""
+        return self.single_flight.stats()
+    
+    def get_backend_stats(self) -> Dict[str, Any]:
+        """Get Gemini circuit breaker state and rate limiter counters."""
+        return {
+            'circuit_breaker': self.gemini_client.breaker.stats(),
+            'rate_limiter': self.gemini_client.rate_limiter.stats()
+        }
     
     def clear_history(self):
         """Clear the conversation history."""
-        self.conversation_history = []
+        self.conversation_history.clear()
     
     def set_gemini_api_key(self, api_key: str):
         """Update Gemini API key and reinitialize connection."""
         self.gemini_api_key = api_key
         if api_key:
-            self._setup_gemini()
-        else:
-            self.ai_available = False
\ No newline at end of file
+            self._setup_gemini()
\ No newline at end of file
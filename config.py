@@ -2,6 +2,8 @@
 Configuration settings for Fetii AI Chatbot
 """
 
+import os
+
 # File settings
 CSV_FILE_PATH = "fetii_data.csv"
 SAMPLE_DATA_SIZE = 2000
@@ -55,6 +57,54 @@ CHATBOT_CONFIG = {
     ]
 }
 
+# Rendered dashboard figures
+FIGURE_CACHE_CONFIG = {
+    'max_entries': 64,
+    'max_bytes': 32 * 1024 * 1024  # 32 MB of figure data arrays
+}
+
+# Per-session chatbot state
+SESSION_CONFIG = {
+    'max_sessions': 500,
+    'idle_ttl_seconds': 1800
+}
+
+# Gemini API client settings
+GEMINI_CONFIG = {
+    'base_url': os.getenv('GEMINI_BASE_URL', 'https://generativelanguage.googleapis.com/v1beta'),
+    'model': 'gemini-1.5-flash-latest',
+    'pool_connections': 4,
+    'pool_maxsize': 32,
+    'connect_timeout': 3.05,
+    'read_timeout': 15,
+    'probe_read_timeout': 5,
+    'health_ttl_seconds': 600,
+    'health_failure_ttl_seconds': 60,
+    'data_workers': 4,
+    'stream_responses': True
+}
+
+# Race the pattern answer against Gemini under a latency budget
+HEDGING_CONFIG = {
+    'enabled': True,
+    'latency_budget_seconds': 4.0,
+    'warm_cache_with_late_answers': True
+}
+
+# Client-side Gemini quota (token bucket)
+RATE_LIMIT_CONFIG = {
+    'requests_per_minute': 15,
+    'burst': 5
+}
+
+# Gemini circuit breaker settings
+CIRCUIT_BREAKER_CONFIG = {
+    'failure_threshold': 3,
+    'base_backoff_seconds': 5,
+    'max_backoff_seconds': 300,
+    'jitter': 0.5
+}
+
 # Location categories for analysis
 LOCATION_CATEGORIES = {
     'entertainment': [
@@ -111,10 +161,13 @@ ANALYSIS_THRESHOLDS = {
 
 # Export configuration
 EXPORT_CONFIG = {
-    'formats': ['csv', 'json', 'pdf'],
+    'formats': ['csv', 'json', 'ndjson', 'parquet', 'pdf'],
     'max_export_rows': 10000,
     'include_visualizations': True,
-    'compression': 'gzip'
+    'compression': 'gzip',
+    'compression_level': 6,  # gzip level; 9 is ~40% slower for ~2% smaller files
+    'chunk_rows': 50000,  # rows encoded at a time by streaming exports
+    'workers': 2  # threads running background exports
 }
 
 # UI Icons (using simple unicode icons)
@@ -214,6 +267,7 @@ VALIDATION_RULES = {
     'min_passengers': 1,
     'max_passengers': 20,
     'required_fields': ['Trip ID', 'Total Passengers', 'Trip Date and Time'],
+    'field_replacements': {'Trip Date and Time': 'datetime'},  # parsed columns kept when the compact schema drops the raw ones
     'date_formats': ['%m/%d/%y %H:%M', '%m/%d/%Y %H:%M', '%Y-%m-%d %H:%M:%S'],
     'coordinate_bounds': {
         'lat_min': 30.0,
@@ -223,12 +277,34 @@ VALIDATION_RULES = {
     }
 }
 
+# Processed-data snapshot settings
+SNAPSHOT_CONFIG = {
+    'enabled': True,
+    'directory': '.fetii_cache',
+    'hash_chunk_size': 1 << 20  # 1 MB reads when fingerprinting the CSV
+}
+
+# Chunked CSV ingestion settings
+STREAMING_CONFIG = {
+    'enabled': False,     # keep only aggregate insights, never the full trip table
+    'chunk_size': 100000  # rows per CSV chunk
+}
+
 # Performance settings
 PERFORMANCE = {
     'max_rows_for_visualization': 10000,
     'cache_timeout': 3600,  # 1 hour
     'pagination_size': 50,
-    'max_memory_usage': '1GB'
+    'max_memory_usage': '1GB',
+    'compact_schema': False,  # categorical/downcast dtypes for the trip table
+    'max_location_cells': 16  # dashboard location filters kept pre-aggregated
+}
+
+# Chatbot response cache settings
+RESPONSE_CACHE_CONFIG = {
+    'max_entries': 1000,
+    'max_bytes': 5 * 1024 * 1024,  # 5 MB of cached responses
+    'ttl_seconds': PERFORMANCE['cache_timeout']
 }
 
 # Error messages
@@ -237,7 +313,8 @@ ERROR_MESSAGES = {
     'invalid_data': 'Invalid data format detected. Please check your data.',
     'no_results': 'No results found for your query. Try adjusting your filters.',
     'processing_error': 'An error occurred while processing your request.',
-    'visualization_error': 'Unable to create visualization with current data.'
+    'visualization_error': 'Unable to create visualization with current data.',
+    'filters_unavailable': 'Filters are unavailable in streaming mode, which keeps no trip table.'
 }
 
 # Success messages
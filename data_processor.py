@@ -1,34 +1,531 @@
+import copy
+import hashlib
+import os
+import pickle
+import re
+import threading
+from collections import Counter, OrderedDict
 import pandas as pd
 import numpy as np
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
+import config
+from trip_index import TripIndex
+from location_matcher import LocationMatcher
+from single_flight import SingleFlight
+
+# Bump whenever cleaning/feature logic changes so old snapshots are rebuilt.
+PROCESSING_VERSION = 6
+
+ENTERTAINMENT_KEYWORDS = ['bar', 'club', 'lounge', 'aquarium', 'rooftop', 'social', 'pub']
+CAMPUS_KEYWORDS = ['campus', 'university', 'drag', 'west campus']
+
+# Compact-schema column groups
+CATEGORICAL_COLUMNS = ['Pick Up Address', 'Drop Off Address', 'pickup_main', 'dropoff_main',
+                       'day_of_week', 'time_category', 'group_category']
+INT8_COLUMNS = ['Total Passengers', 'hour']
+COORDINATE_COLUMNS = ['Pick Up Latitude', 'Pick Up Longitude', 'Drop Off Latitude', 'Drop Off Longitude']
+ID_COLUMNS = ['Trip ID', 'Booking User ID']
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def _map_unique(values: pd.Series, transform) -> pd.Series:
+    """Run a vectorized transform over the distinct values of a column and broadcast it back."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    mapped = transform(pd.Series(uniques, dtype=values.dtype))
+    return pd.Series(mapped.to_numpy()[codes], index=values.index, dtype=mapped.dtype)
+
+
+def _contains_any(locations: pd.Series, keywords: list) -> pd.Series:
+    """Case-insensitive check for any of the keywords in each location."""
+    pattern = '|'.join(re.escape(keyword) for keyword in keywords)
+    return locations.str.lower().str.contains(pattern, regex=True, na=False)
+
+
+def _observed_counts(values: pd.Series, sort: bool = True) -> Dict[Any, int]:
+    """Value counts without the zero rows categoricals report for unused categories."""
+    counts = values.value_counts(sort=sort)
+    return counts[counts > 0].to_dict()
+
+
+def _ranked_counts(counts: pd.Series) -> Dict[Any, int]:
+    """Non-zero counts ordered from most to least frequent."""
+    counts = counts[counts > 0].sort_values(ascending=False, kind='stable')
+    return {label: int(count) for label, count in counts.items()}
+
+
+def _nonzero_counter(counts: np.ndarray, labels=None) -> Counter:
+    """Counter of the non-zero entries of a count array, keyed by position or by the matching label."""
+    positions = np.flatnonzero(counts)
+    keys = positions.tolist() if labels is None else [labels[position] for position in positions]
+    return Counter(dict(zip(keys, counts[positions].astype(np.int64).tolist())))
+
+
+def _passenger_sums(passengers: pd.Series, locations: pd.Series) -> Dict[Any, int]:
+    """Total passengers per observed location."""
+    sums = passengers.groupby(locations, observed=True, sort=False).sum()
+    return {location: int(total) for location, total in sums.items()}
+
+
+def _concat_trips(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate trip frames, widening categoricals so they stay categorical."""
+    frames = [frame.copy(deep=False) for frame in frames]
+    for col in frames[0].columns:
+        if isinstance(frames[0][col].dtype, pd.CategoricalDtype):
+            categories = frames[0][col].cat.categories
+            for frame in frames[1:]:
+                categories = categories.union(frame[col].astype('category').cat.categories, sort=False)
+            for frame in frames:
+                frame[col] = frame[col].astype(pd.CategoricalDtype(categories))
+    return pd.concat(frames)
+
+
+def _merge_moments(first: tuple, second: tuple) -> tuple:
+    """Combine two (count, mean, sum of squared deviations) triples (Chan et al.)."""
+    count_a, mean_a, m2_a = first
+    count_b, mean_b, m2_b = second
+    if count_a == 0:
+        return second
+    if count_b == 0:
+        return first
+    
+    count = count_a + count_b
+    delta = mean_b - mean_a
+    return (count,
+            mean_a + delta * count_b / count,
+            m2_a + m2_b + delta * delta * count_a * count_b / count)
+
+
+class TripCube:
+    """
+    Dense trip counts indexed by day of week (Monday=0), hour and passenger count.
+    """
+    
+    def __init__(self, max_passengers: int = config.VALIDATION_RULES['max_passengers']):
+        """Start from an all-zero cube."""
+        self.counts = np.zeros((7, 24, max_passengers + 1), dtype=np.int64)
+    
+    @property
+    def passenger_sums(self) -> np.ndarray:
+        """Total passengers per (day, hour, passenger count) cell."""
+        return self.counts * np.arange(self.counts.shape[2])
+    
+    def update(self, df: pd.DataFrame):
+        """Fold a featurized trip frame into the cube."""
+        days = df['datetime'].dt.dayofweek.to_numpy(dtype=np.int64)
+        hours = df['hour'].to_numpy(dtype=np.int64)
+        passengers = np.clip(df['Total Passengers'].to_numpy(dtype=np.int64), 0, None)
+        
+        if len(passengers) and passengers.max() >= self.counts.shape[2]:
+            self._grow(int(passengers.max()) + 1)
+        
+        cells = (days * 24 + hours) * self.counts.shape[2] + passengers
+        self.counts += np.bincount(cells, minlength=self.counts.size).reshape(self.counts.shape)
+    
+    def merge(self, other: 'TripCube'):
+        """Add another cube's counts into this one."""
+        if other.counts.shape[2] > self.counts.shape[2]:
+            self._grow(other.counts.shape[2])
+        self.counts[:, :, :other.counts.shape[2]] += other.counts
+    
+    def _grow(self, passenger_slots: int):
+        """Widen the passenger axis to hold larger groups."""
+        counts = np.zeros((7, 24, passenger_slots), dtype=np.int64)
+        counts[:, :, :self.counts.shape[2]] = self.counts
+        self.counts = counts
+    
+    def select(self, min_passengers: Optional[int] = None) -> np.ndarray:
+        """Get the counts for groups of at least min_passengers riders."""
+        if min_passengers:
+            return self.counts[:, :, max(min_passengers, 0):]
+        return self.counts
+
+
+class TripAggregates:
+    """
+    Mergeable running aggregates behind the quick insights and dashboard charts.
+    """
+    
+    def __init__(self):
+        """Start from an empty set of counters."""
+        self.total_trips = 0
+        self.passenger_sum = 0
+        self.large_groups_count = 0
+        self.hourly = Counter()
+        self.group_sizes = Counter()
+        self.pickups = Counter()
+        self.dropoffs = Counter()
+        # Passengers per location, so location stats work without the trip table
+        self.pickup_passengers = Counter()
+        self.dropoff_passengers = Counter()
+        self.daily = Counter()
+        self.cube = TripCube()
+        # Trip distance moments by group size, or None when the data has no coordinates
+        self.distance_moments: Optional[Dict[int, tuple]] = None
+    
+    def update(self, df: pd.DataFrame):
+        """Fold a featurized trip frame into the running totals."""
+        passengers = df['Total Passengers']
+        large_group_threshold = config.ANALYSIS_THRESHOLDS['large_group_threshold']
+        
+        self.total_trips += len(df)
+        self.passenger_sum += int(passengers.sum())
+        self.large_groups_count += int((passengers >= large_group_threshold).sum())
+        
+        # sort=False keeps first-appearance order, so ties rank the same as a full value_counts
+        self.hourly.update(_observed_counts(df['hour'], sort=False))
+        self.group_sizes.update(_observed_counts(passengers, sort=False))
+        self.pickups.update(_observed_counts(df['pickup_main'], sort=False))
+        self.dropoffs.update(_observed_counts(df['dropoff_main'], sort=False))
+        self.pickup_passengers.update(_passenger_sums(passengers, df['pickup_main']))
+        self.dropoff_passengers.update(_passenger_sums(passengers, df['dropoff_main']))
+        # Day keys are Timestamps under either schema ('date' holds datetime.date unless compacted), as in TripCells
+        self.daily.update({pd.Timestamp(day): count for day, count in _observed_counts(df['date'], sort=False).items()})
+        self.cube.update(df)
+        
+        if all(col in df.columns for col in COORDINATE_COLUMNS):
+            distance = np.sqrt(
+                (df['Drop Off Latitude'] - df['Pick Up Latitude'])**2 +
+                (df['Drop Off Longitude'] - df['Pick Up Longitude'])**2
+            ) * 111  # Approximate km conversion
+            stats = distance.groupby(passengers).agg(['count', 'mean', 'var'])
+            moments = {
+                int(size): (int(count), mean, var * (count - 1) if count > 1 else 0.0)
+                for size, count, mean, var in zip(stats.index, stats['count'], stats['mean'], stats['var'])
+            }
+            self._merge_distance_moments(moments)
+    
+    def _merge_distance_moments(self, moments: Dict[int, tuple]):
+        """Fold per-group-size distance moments into the running ones."""
+        if self.distance_moments is None:
+            self.distance_moments = {}
+        for size, moment in moments.items():
+            current = self.distance_moments.get(size)
+            self.distance_moments[size] = moment if current is None else _merge_moments(current, moment)
+    
+    def merge(self, other: 'TripAggregates'):
+        """Fold another set of aggregates into this one."""
+        self.total_trips += other.total_trips
+        self.passenger_sum += other.passenger_sum
+        self.large_groups_count += other.large_groups_count
+        self.hourly.update(other.hourly)
+        self.group_sizes.update(other.group_sizes)
+        self.pickups.update(other.pickups)
+        self.dropoffs.update(other.dropoffs)
+        self.pickup_passengers.update(other.pickup_passengers)
+        self.dropoff_passengers.update(other.dropoff_passengers)
+        self.daily.update(other.daily)
+        self.cube.merge(other.cube)
+        if other.distance_moments is not None:
+            self._merge_distance_moments(other.distance_moments)
+    
+    def to_insights(self) -> Dict[str, Any]:
+        """Build the quick insights dictionary from the running totals."""
+        total = self.total_trips
+        return {
+            'total_trips': total,
+            'avg_group_size': self.passenger_sum / total if total else 0.0,
+            'peak_hour': min(self.hourly, key=lambda hour: (-self.hourly[hour], hour)) if self.hourly else None,
+            'large_groups_count': self.large_groups_count,
+            'large_groups_pct': (self.large_groups_count / total) * 100 if total else 0.0,
+            'top_pickups': self.pickups.most_common(10),
+            'top_dropoffs': self.dropoffs.most_common(10),
+            'hourly_distribution': dict(sorted(self.hourly.items())),
+            'group_size_distribution': dict(sorted(self.group_sizes.items()))
+        }
+
+
+class TripCells:
+    """
+    Trip aggregates pre-computed per day and group size, ready to be sliced by filters.
+    
+    Trip counts are kept as a dense day x hour x group-size array, distance
+    moments per day and group size, and pickup/drop-off counts as sparse
+    (day, group size, location) cells sorted by day, so any date range and
+    group-size range is answered by slicing these instead of rescanning trips.
+    """
+    
+    def __init__(self, index: TripIndex, rows: Optional[np.ndarray] = None):
+        """Pre-aggregate the given rows of an indexed trip table (all rows by default)."""
+        rows = slice(None) if rows is None else rows
+        date_codes, dates = pd.factorize(index.datetimes[rows].astype('datetime64[D]'), sort=True)
+        self.dates = pd.DatetimeIndex(dates)
+        
+        all_passengers = np.clip(index.passengers.astype(np.int64), 0, None)
+        passengers = all_passengers[rows]
+        # Sized from the whole table, so every filter yields cubes as wide as the unfiltered one
+        self.passenger_slots = max(config.VALIDATION_RULES['max_passengers'], int(all_passengers.max(initial=0))) + 1
+        
+        day_groups = date_codes * self.passenger_slots + passengers
+        self.counts = np.bincount(
+            (date_codes * 24 + index.hours[rows]) * self.passenger_slots + passengers,
+            minlength=len(self.dates) * 24 * self.passenger_slots
+        ).reshape(len(self.dates), 24, self.passenger_slots)
+        
+        self.pickups = self._location_cells(index.pickup, rows, day_groups)
+        self.dropoffs = self._location_cells(index.dropoff, rows, day_groups)
+        self.distance_moments = self._distance_moments(index.df, rows, day_groups)
+    
+    def _location_cells(self, column, rows, day_groups: np.ndarray) -> tuple:
+        """Count trips per (day, group size, location) cell, returning the cell days, groups, codes, counts and names."""
+        num_names = len(column.names)
+        cells, counts = np.unique(day_groups * num_names + column.codes[rows], return_counts=True)
+        day_groups_of_cells, codes = np.divmod(cells, num_names)
+        days, groups = np.divmod(day_groups_of_cells, self.passenger_slots)
+        return days, groups, codes, counts, column.names.to_numpy()
+    
+    def _distance_moments(self, df: pd.DataFrame, rows, day_groups: np.ndarray) -> Optional[tuple]:
+        """Get trip distance (count, mean, sum of squared deviations) arrays per day and group size."""
+        if not all(col in df.columns for col in COORDINATE_COLUMNS):
+            return None
+        
+        # Subset each column before converting, so only the selected rows are copied
+        pickup_lat, pickup_lon, dropoff_lat, dropoff_lon = (
+            df[col].to_numpy()[rows].astype(np.float64, copy=False) for col in COORDINATE_COLUMNS)
+        distance = np.sqrt(
+            (dropoff_lat - pickup_lat)**2 +
+            (dropoff_lon - pickup_lon)**2
+        ) * 111  # Approximate km conversion
+        valid = ~np.isnan(distance)
+        cells, distance = day_groups[valid], distance[valid]
+        
+        shape = (len(self.dates), self.passenger_slots)
+        count = np.bincount(cells, minlength=shape[0] * shape[1])
+        mean = np.bincount(cells, weights=distance, minlength=count.size) / np.maximum(count, 1)
+        m2 = np.bincount(cells, weights=(distance - mean[cells])**2, minlength=count.size)
+        return count.reshape(shape), mean.reshape(shape), m2.reshape(shape)
+    
+    def aggregate(self, date_range: Optional[tuple] = None, min_passengers: Optional[int] = None,
+                  max_passengers: Optional[int] = None) -> TripAggregates:
+        """Build the trip aggregates for calendar days in date_range and groups within the passenger bounds."""
+        first_day, last_day = 0, len(self.dates)
+        if date_range:
+            start, end = date_range
+            if start:
+                first_day = self.dates.searchsorted(pd.Timestamp(start).normalize())
+            if end:
+                last_day = self.dates.searchsorted(pd.Timestamp(end).normalize() + pd.Timedelta(days=1))
+            last_day = max(first_day, last_day)
+        first_group = max(int(min_passengers or 0), 0)
+        last_group = self.passenger_slots if max_passengers is None else min(int(max_passengers) + 1, self.passenger_slots)
+        last_group = max(first_group, last_group)
+        
+        counts = np.zeros((last_day - first_day, 24, self.passenger_slots), dtype=np.int64)
+        counts[:, :, first_group:last_group] = self.counts[first_day:last_day, :, first_group:last_group]
+        days_of_week = self.dates.dayofweek[first_day:last_day]
+        
+        aggregates = TripAggregates()
+        cube = aggregates.cube
+        if self.passenger_slots > cube.counts.shape[2]:
+            cube._grow(self.passenger_slots)
+        for day in range(7):
+            cube.counts[day, :, :self.passenger_slots] = counts[days_of_week == day].sum(axis=0)
+        
+        by_group = cube.counts.sum(axis=(0, 1))
+        large_group_threshold = config.ANALYSIS_THRESHOLDS['large_group_threshold']
+        aggregates.total_trips = int(by_group.sum())
+        aggregates.passenger_sum = int(by_group @ np.arange(len(by_group)))
+        aggregates.large_groups_count = int(by_group[large_group_threshold:].sum())
+        aggregates.hourly = _nonzero_counter(cube.counts.sum(axis=(0, 2)))
+        aggregates.group_sizes = _nonzero_counter(by_group)
+        aggregates.daily = _nonzero_counter(counts.sum(axis=(1, 2)), self.dates[first_day:last_day])
+        aggregates.pickups, aggregates.pickup_passengers = self._location_counts(
+            self.pickups, first_day, last_day, first_group, last_group)
+        aggregates.dropoffs, aggregates.dropoff_passengers = self._location_counts(
+            self.dropoffs, first_day, last_day, first_group, last_group)
+        
+        if self.distance_moments is not None:
+            count, mean, m2 = (part[first_day:last_day, first_group:last_group] for part in self.distance_moments)
+            group_count = count.sum(axis=0)
+            group_mean = (count * mean).sum(axis=0) / np.maximum(group_count, 1)
+            group_m2 = (m2 + count * (mean - group_mean)**2).sum(axis=0)
+            aggregates.distance_moments = {
+                first_group + int(group): (int(group_count[group]), float(group_mean[group]), float(group_m2[group]))
+                for group in np.flatnonzero(group_count)
+            }
+        
+        return aggregates
+    
+    @staticmethod
+    def _location_counts(cells: tuple, first_day: int, last_day: int, first_group: int,
+                         last_group: int) -> Tuple[Counter, Counter]:
+        """Sum the trips and passengers of the location cells that fall in the day and group-size ranges."""
+        days, groups, codes, counts, names = cells
+        start, stop = np.searchsorted(days, [first_day, last_day])
+        keep = slice(start, stop)
+        in_groups = (groups[keep] >= first_group) & (groups[keep] < last_group)
+        codes, groups, counts = codes[keep][in_groups], groups[keep][in_groups], counts[keep][in_groups]
+        trips = np.bincount(codes, weights=counts, minlength=len(names))
+        passengers = np.bincount(codes, weights=counts * groups, minlength=len(names))
+        return _nonzero_counter(trips, names), _nonzero_counter(passengers, names)
+
 
 class DataProcessor:
     """
     Handles all data processing and analysis for Fetii rideshare data.
     """
     
-    def __init__(self, csv_file_path: str = "fetii_data.csv"):
-        """Initialize the data processor with the CSV file."""
+    def __init__(self, csv_file_path: str = "fetii_data.csv", use_snapshot: Optional[bool] = None,
+                 compact_schema: Optional[bool] = None, streaming: Optional[bool] = None):
+        """
+        Initialize the data processor with the CSV file.
+        
+        In streaming mode only the aggregate insights are kept and self.df stays None,
+        so peak memory is bounded by the chunk size rather than the file size.
+        """
         self.csv_file_path = csv_file_path
+        self.use_snapshot = config.SNAPSHOT_CONFIG['enabled'] if use_snapshot is None else use_snapshot
+        self.compact_schema = (config.PERFORMANCE['compact_schema'] if compact_schema is None
+                               else compact_schema)
+        self.streaming = config.STREAMING_CONFIG['enabled'] if streaming is None else streaming
+        self._lock = threading.RLock()
         self.df = None
         self.insights = {}
+        self.aggregates = TripAggregates()
+        self.data_version = 0
+        self._next_row_id = 0
+        self._trip_index = None
+        self._trip_index_version = None
+        self._location_matcher = None
+        self._location_matcher_version = None
+        self._location_catalog = None
+        self._derived = {}
+        self._location_cells = OrderedDict()
+        self._derived_version = None
+        # Slow builds run outside self._lock, once per key however many callers need them
+        self._builds = SingleFlight()
         self.load_and_process_data()
     
+    @property
+    def df(self) -> Optional[pd.DataFrame]:
+        """The processed trip table, folding in any batches appended since the last read."""
+        if self._pending_batches:
+            with self._lock:
+                if self._pending_batches:
+                    self._df = _concat_trips([self._df] + self._pending_batches)
+                    self._pending_batches = []
+        return self._df
+    
+    @df.setter
+    def df(self, value: Optional[pd.DataFrame]):
+        self._df = value
+        self._pending_batches = []
+    
+    @property
+    def has_trip_table(self) -> bool:
+        """Whether the row-level trip table is kept (streaming mode keeps only the aggregates)."""
+        return self._df is not None
+    
     def load_and_process_data(self):
         """Load and process the Fetii trip data."""
         try:
-            self.df = pd.read_csv(self.csv_file_path)
-            
-            self._clean_data()
-            self._extract_temporal_features()
-            self._extract_location_features()
-            self._calculate_insights()
-            
-            print(f"✅ Successfully loaded {len(self.df)} trips from Austin")
-            
+            if self.streaming:
+                self._stream_insights()
+                print(f"✅ Streamed {self.insights['total_trips']} trips from Austin")
+            else:
+                snapshot_key = self._snapshot_key() if self.use_snapshot else None
+                if snapshot_key and self._load_snapshot(snapshot_key):
+                    print(f"✅ Loaded {len(self.df)} trips from snapshot")
+                else:
+                    self.df = self._featurize(pd.read_csv(self.csv_file_path))
+                    self._calculate_insights()
+                    
+                    print(f"✅ Successfully loaded {len(self.df)} trips from Austin")
+                    
+                    if snapshot_key:
+                        self._save_snapshot(snapshot_key)
+        
         except FileNotFoundError:
             print("⚠️ CSV file not found. Creating sample data for demo...")
             self._create_sample_data()
+        
+        if self.compact_schema and self.df is not None:
+            self.df = self._compact_frame(self.df)
+        
+        self._next_row_id = int(self.df.index.max()) + 1 if self.df is not None and len(self.df) else 0
+        self.data_version += 1
+    
+    def append_trips(self, rows) -> int:
+        """
+        Append new raw trips and update the insights incrementally.
+        
+        Accepts a DataFrame or a list of dicts with the same columns as the CSV.
+        Only the new rows are featurized and folded into the running aggregates;
+        readers keep seeing the previous table and insights until the swap.
+        Returns the number of trips added after cleaning.
+        """
+        batch = pd.DataFrame(rows)
+        if batch.empty:
+            return 0
+        
+        batch = self._featurize(batch)
+        if self.compact_schema:
+            batch = self._compact_frame(batch)
+        
+        with self._lock:
+            batch.index = pd.RangeIndex(self._next_row_id, self._next_row_id + len(batch))
+            self._next_row_id += len(batch)
+            
+            aggregates = copy.deepcopy(self.aggregates)
+            aggregates.update(batch)
+            
+            if self._df is not None:
+                self._pending_batches = self._pending_batches + [batch]
+            self.aggregates = aggregates
+            self.insights = aggregates.to_insights()
+            self.data_version += 1
+        
+        return len(batch)
+    
+    def _snapshot_key(self) -> str:
+        """Fingerprint the source CSV together with the processing version."""
+        digest = hashlib.sha256(f"v{PROCESSING_VERSION}:".encode())
+        chunk_size = config.SNAPSHOT_CONFIG['hash_chunk_size']
+        with open(self.csv_file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def _snapshot_paths(self) -> Dict[str, str]:
+        """Get the snapshot data and metadata paths for the current CSV."""
+        stem = os.path.splitext(os.path.basename(self.csv_file_path))[0]
+        base = os.path.join(config.SNAPSHOT_CONFIG['directory'], stem)
+        return {'data': f"{base}.snapshot.parquet", 'meta': f"{base}.snapshot.pkl"}
+    
+    def _load_snapshot(self, key: str) -> bool:
+        """Load the processed frame and insights if a matching snapshot exists."""
+        paths = self._snapshot_paths()
+        try:
+            with open(paths['meta'], 'rb') as f:
+                meta = pickle.load(f)
+            if meta.get('key') != key:
+                return False
+            df = pd.read_parquet(paths['data'])
+            aggregates = meta['aggregates']
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable snapshot: {str(e)}")
+            return False
+        
+        self.df = df
+        self.aggregates = aggregates
+        self.insights = aggregates.to_insights()
+        return True
+    
+    def _save_snapshot(self, key: str):
+        """Persist the processed frame and insights for faster restarts."""
+        paths = self._snapshot_paths()
+        try:
+            os.makedirs(config.SNAPSHOT_CONFIG['directory'], exist_ok=True)
+            # Write to temp files first so a crash never leaves a half-written snapshot
+            self.df.to_parquet(paths['data'] + '.tmp')
+            with open(paths['meta'] + '.tmp', 'wb') as f:
+                pickle.dump({'key': key, 'aggregates': self.aggregates}, f)
+            os.replace(paths['data'] + '.tmp', paths['data'])
+            os.replace(paths['meta'] + '.tmp', paths['meta'])
+        except Exception as e:
+            print(f"⚠️ Could not write data snapshot: {str(e)}")
     
     def _create_sample_data(self):
         """Create sample data based on the analysis patterns."""
@@ -74,155 +571,293 @@ class DataProcessor:
                 'Total Passengers': passengers
             })
         
-        self.df = pd.DataFrame(sample_data)
-        self._clean_data()
-        self._extract_temporal_features()
-        self._extract_location_features()
+        self.df = self._featurize(pd.DataFrame(sample_data))
         self._calculate_insights()
     
-    def _clean_data(self):
+    def _featurize(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Clean a raw trip frame and derive the temporal and location features."""
+        df = self._clean_data(df)
+        df = self._extract_temporal_features(df)
+        return self._extract_location_features(df)
+    
+    def _clean_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """Clean and standardize the data."""
-        self.df = self.df.dropna(subset=['Total Passengers', 'Trip Date and Time'])
+        df = df.dropna(subset=['Total Passengers', 'Trip Date and Time'])
         
-        self.df['Total Passengers'] = self.df['Total Passengers'].astype(int)
+        df['Total Passengers'] = df['Total Passengers'].astype(int)
         
-        self.df['pickup_main'] = self.df['Pick Up Address'].apply(self._extract_main_location)
-        self.df['dropoff_main'] = self.df['Drop Off Address'].apply(self._extract_main_location)
+        df['pickup_main'] = _map_unique(df['Pick Up Address'], self._extract_main_location)
+        df['dropoff_main'] = _map_unique(df['Drop Off Address'], self._extract_main_location)
+        
+        return df
     
-    def _extract_main_location(self, address: str) -> str:
-        """Extract the main location name from an address."""
-        if pd.isna(address):
-            return "Unknown"
-        return address.split(',')[0].strip()
+    def _extract_main_location(self, addresses: pd.Series) -> pd.Series:
+        """Extract the main location name from each address."""
+        # A column with no addresses at all is read as float NaN, which the .str accessor rejects
+        return addresses.astype(object).str.split(',', n=1).str[0].str.strip().fillna("Unknown")
     
-    def _extract_temporal_features(self):
+    def _extract_temporal_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Extract temporal features from trip data."""
-        self.df['datetime'] = pd.to_datetime(self.df['Trip Date and Time'], format='%m/%d/%y %H:%M')
-        self.df['hour'] = self.df['datetime'].dt.hour
-        self.df['day_of_week'] = self.df['datetime'].dt.day_name()
-        self.df['date'] = self.df['datetime'].dt.date
-        
-        self.df['time_category'] = self.df['hour'].apply(self._categorize_time)
-    
-    def _categorize_time(self, hour: int) -> str:
-        """Categorize hour into time periods."""
-        if 6 <= hour < 12:
-            return "Morning"
-        elif 12 <= hour < 17:
-            return "Afternoon"
-        elif 17 <= hour < 21:
-            return "Evening"
-        elif 21 <= hour <= 23:
-            return "Night"
-        else:
-            return "Late Night"
+        df['datetime'] = pd.to_datetime(df['Trip Date and Time'], format='%m/%d/%y %H:%M')
+        df['hour'] = df['datetime'].dt.hour
+        df['day_of_week'] = df['datetime'].dt.day_name()
+        df['date'] = df['datetime'].dt.date
+        
+        df['time_category'] = self._categorize_time(df['hour'])
+        
+        return df
     
-    def _extract_location_features(self):
+    def _categorize_time(self, hours: pd.Series) -> pd.Series:
+        """Categorize hours into time periods."""
+        conditions = [
+            (hours >= 6) & (hours < 12),
+            (hours >= 12) & (hours < 17),
+            (hours >= 17) & (hours < 21),
+            (hours >= 21) & (hours <= 23)
+        ]
+        choices = ["Morning", "Afternoon", "Evening", "Night"]
+        return pd.Series(np.select(conditions, choices, default="Late Night"), index=hours.index)
+    
+    def _extract_location_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Extract location-based features."""
-        self.df['group_category'] = self.df['Total Passengers'].apply(self._categorize_group_size)
-        
-        self.df['is_entertainment'] = self.df['dropoff_main'].apply(self._is_entertainment_venue)
-        self.df['is_campus'] = self.df['pickup_main'].apply(self._is_campus_location)
-    
-    def _categorize_group_size(self, passengers: int) -> str:
-        """Categorize group size."""
-        if passengers <= 4:
-            return "Small (1-4)"
-        elif passengers <= 8:
-            return "Medium (5-8)"
-        elif passengers <= 12:
-            return "Large (9-12)"
-        else:
-            return "Extra Large (13+)"
+        df['group_category'] = self._categorize_group_size(df['Total Passengers'])
+        
+        df['is_entertainment'] = _map_unique(df['dropoff_main'], self._is_entertainment_venue)
+        df['is_campus'] = _map_unique(df['pickup_main'], self._is_campus_location)
+        
+        return df
     
-    def _is_entertainment_venue(self, location: str) -> bool:
-        """Check if location is an entertainment venue."""
-        entertainment_keywords = ['bar', 'club', 'lounge', 'aquarium', 'rooftop', 'social', 'pub']
-        return any(keyword in location.lower() for keyword in entertainment_keywords)
+    def _categorize_group_size(self, passengers: pd.Series) -> pd.Series:
+        """Categorize group sizes."""
+        conditions = [passengers <= 4, passengers <= 8, passengers <= 12]
+        choices = ["Small (1-4)", "Medium (5-8)", "Large (9-12)"]
+        return pd.Series(np.select(conditions, choices, default="Extra Large (13+)"), index=passengers.index)
     
-    def _is_campus_location(self, location: str) -> bool:
-        """Check if location is campus-related."""
-        campus_keywords = ['campus', 'university', 'drag', 'west campus']
-        return any(keyword in location.lower() for keyword in campus_keywords)
+    def _is_entertainment_venue(self, locations: pd.Series) -> pd.Series:
+        """Check which locations are entertainment venues."""
+        return _contains_any(locations, ENTERTAINMENT_KEYWORDS)
+    
+    def _is_campus_location(self, locations: pd.Series) -> pd.Series:
+        """Check which locations are campus-related."""
+        return _contains_any(locations, CAMPUS_KEYWORDS)
+    
+    def _compact_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Shrink a trip frame with categorical and downcast dtypes."""
+        # The raw timestamp strings are nearly all distinct and the parsed datetime column already holds them
+        df = df.drop(columns=['Trip Date and Time'], errors='ignore')
+        
+        for col in CATEGORICAL_COLUMNS:
+            if col in df.columns:
+                df[col] = df[col].astype('category')
+        
+        for col in INT8_COLUMNS:
+            df[col] = df[col].astype(np.int8)
+        
+        for col in COORDINATE_COLUMNS:
+            if col in df.columns:
+                df[col] = df[col].astype(np.float32)
+        
+        for col in ID_COLUMNS:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], downcast='integer')
+        
+        df['date'] = df['datetime'].dt.normalize()
+        
+        return df
+    
+    def memory_report(self) -> Dict[str, Any]:
+        """Get the in-memory size of the trip table in bytes per column (nothing in streaming mode)."""
+        if self.df is None:
+            return {'columns': {}, 'total_bytes': 0, 'compact_schema': self.compact_schema}
+        usage = self.df.memory_usage(deep=True, index=False)
+        return {
+            'columns': usage.to_dict(),
+            'total_bytes': int(usage.sum()),
+            'compact_schema': self.compact_schema
+        }
     
     def _calculate_insights(self):
         """Calculate key insights from the data."""
-        self.insights = {
-            'total_trips': len(self.df),
-            'avg_group_size': self.df['Total Passengers'].mean(),
-            'peak_hour': self.df['hour'].mode().iloc[0],
-            'large_groups_count': len(self.df[self.df['Total Passengers'] >= 6]),
-            'large_groups_pct': (len(self.df[self.df['Total Passengers'] >= 6]) / len(self.df)) * 100,
-            'top_pickups': list(self.df['pickup_main'].value_counts().head(10).items()),
-            'top_dropoffs': list(self.df['dropoff_main'].value_counts().head(10).items()),
-            'hourly_distribution': self.df['hour'].value_counts().sort_index().to_dict(),
-            'group_size_distribution': self.df['Total Passengers'].value_counts().sort_index().to_dict()
-        }
+        self.aggregates = TripAggregates()
+        self.aggregates.update(self.df)
+        self.insights = self.aggregates.to_insights()
+    
+    def _stream_insights(self):
+        """Compute insights by folding bounded CSV chunks into running aggregates."""
+        self.aggregates = TripAggregates()
+        for chunk in pd.read_csv(self.csv_file_path, chunksize=config.STREAMING_CONFIG['chunk_size']):
+            self.aggregates.update(self._featurize(chunk))
+        self.insights = self.aggregates.to_insights()
     
     def get_quick_insights(self) -> Dict[str, Any]:
         """Get quick insights for dashboard."""
         return self.insights
     
-    def query_data(self, query_params: Dict[str, Any]) -> pd.DataFrame:
-        """Query the data based on parameters."""
-        filtered_df = self.df.copy()
+    def get_trip_index(self) -> TripIndex:
+        """Get the row indexes for the current data version, building them on first use."""
+        if self.df is None:
+            raise RuntimeError("Row-level queries need the trip table, which streaming mode does not keep")
         
-        if 'pickup_location' in query_params:
-            filtered_df = filtered_df[filtered_df['pickup_main'].str.contains(
-                query_params['pickup_location'], case=False, na=False)]
+        with self._lock:
+            if self._trip_index is not None and self._trip_index_version == self.data_version:
+                return self._trip_index
+            version = self.data_version
+        
+        index = self._builds.run(('trip_index', version), lambda: TripIndex(self.df))
+        with self._lock:
+            if version == self.data_version:
+                self._trip_index = index
+                self._trip_index_version = version
+        return index
+    
+    def get_location_matcher(self) -> LocationMatcher:
+        """Get the location name matcher, recompiling only when the set of known locations changes."""
+        with self._lock:
+            if self._location_matcher_version != self.data_version:
+                catalog = self.aggregates.pickups.keys() | self.aggregates.dropoffs.keys()
+                if catalog != self._location_catalog:
+                    self._location_matcher = LocationMatcher(catalog)
+                    self._location_catalog = catalog
+                self._location_matcher_version = self.data_version
+            return self._location_matcher
+    
+    def get_derived(self, key, build):
+        """Get a value derived from the current data version, building it on first use."""
+        with self._lock:
+            self._reset_stale_derived()
+            if key in self._derived:
+                return self._derived[key]
+            version = self.data_version
         
-        if 'dropoff_location' in query_params:
-            filtered_df = filtered_df[filtered_df['dropoff_main'].str.contains(
-                query_params['dropoff_location'], case=False, na=False)]
+        value = self._builds.run(('derived', version, key), build)
+        with self._lock:
+            if self._derived_version == version:
+                self._derived[key] = value
+        return value
+    
+    def _reset_stale_derived(self):
+        """Drop derived values of an older data version (lock held)."""
+        if self._derived_version != self.data_version:
+            self._derived = {}
+            self._location_cells = OrderedDict()
+            self._derived_version = self.data_version
+    
+    def get_filtered_aggregates(self, filters: Optional[Dict[str, Any]] = None) -> TripAggregates:
+        """
+        Get the trip aggregates restricted to a date range, group-size range and location.
         
-        if 'hour_range' in query_params:
-            start_hour, end_hour = query_params['hour_range']
-            filtered_df = filtered_df[
-                (filtered_df['hour'] >= start_hour) & (filtered_df['hour'] <= end_hour)]
+        Filters use the query_data keys 'date_range', 'min_passengers' and
+        'max_passengers', plus 'location', matched against pickup or drop-off.
+        Without filters the running aggregates are returned as they are; streaming
+        mode keeps no trip table to filter, so filters raise there.
+        """
+        filters = self.active_filters(filters)
+        if not filters:
+            return self.aggregates
+        if self.df is None:
+            raise RuntimeError(config.ERROR_MESSAGES['filters_unavailable'])
         
-        if 'min_passengers' in query_params:
-            filtered_df = filtered_df[filtered_df['Total Passengers'] >= query_params['min_passengers']]
+        cells = self.get_trip_cells(filters.get('location'))
+        return cells.aggregate(filters.get('date_range'), filters.get('min_passengers'), filters.get('max_passengers'))
+    
+    @staticmethod
+    def active_filters(filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Drop the filters left empty."""
+        return {name: value for name, value in (filters or {}).items() if value not in (None, '')}
+    
+    def get_trip_cells(self, location: Optional[str] = None) -> TripCells:
+        """
+        Get the filterable pre-aggregates of every trip, or of those picked up or dropped off at a location.
         
-        if 'max_passengers' in query_params:
-            filtered_df = filtered_df[filtered_df['Total Passengers'] <= query_params['max_passengers']]
+        Per-location cells are kept for the most recently used locations only,
+        since locations are free text typed into the dashboard.
+        """
+        if not location:
+            return self.get_derived('trip_cells', lambda: TripCells(self.get_trip_index()))
         
-        if 'date_range' in query_params:
-            start_date, end_date = query_params['date_range']
-            filtered_df = filtered_df[
-                (filtered_df['date'] >= start_date) & (filtered_df['date'] <= end_date)]
+        with self._lock:
+            self._reset_stale_derived()
+            cells = self._location_cells.get(location)
+            if cells is not None:
+                self._location_cells.move_to_end(location)
+                return cells
+            version = self.data_version
         
-        return filtered_df
+        cells = self._builds.run(('location_cells', version, location), lambda: self._build_location_cells(location))
+        with self._lock:
+            if self._derived_version == version:
+                self._location_cells[location] = cells
+                while len(self._location_cells) > config.PERFORMANCE['max_location_cells']:
+                    self._location_cells.popitem(last=False)
+        return cells
+    
+    def _build_location_cells(self, location: str) -> TripCells:
+        """Pre-aggregate the trips picked up or dropped off at locations containing the text."""
+        index = self.get_trip_index()
+        # Dashboard locations are free text, so they are matched literally
+        rows = np.union1d(index.pickup.postings.rows_for(index.pickup.matching_codes(location, regex=False)),
+                          index.dropoff.postings.rows_for(index.dropoff.matching_codes(location, regex=False)))
+        return TripCells(index, rows)
+    
+    def query_data(self, query_params: Dict[str, Any]) -> pd.DataFrame:
+        """Query the data based on parameters."""
+        index = self.get_trip_index()
+        return index.df.iloc[index.query(query_params)]
     
     def get_location_stats(self, location: str, location_type: str = 'both') -> Dict[str, Any]:
         """Get statistics for a specific location."""
-        if location_type in ['pickup', 'both']:
-            pickup_data = self.df[self.df['pickup_main'].str.contains(location, case=False, na=False)]
+        empty = {'count': 0, 'avg_group_size': 0, 'peak_hours': []}
+        if self.df is None:
+            # Streaming mode: counts and group sizes from the aggregates; hours per location are not kept
+            pickup_stats = lambda: self._aggregate_location_stats(location, self.aggregates.pickups,
+                                                                  self.aggregates.pickup_passengers)
+            dropoff_stats = lambda: self._aggregate_location_stats(location, self.aggregates.dropoffs,
+                                                                   self.aggregates.dropoff_passengers)
         else:
-            pickup_data = pd.DataFrame()
-        
-        if location_type in ['dropoff', 'both']:
-            dropoff_data = self.df[self.df['dropoff_main'].str.contains(location, case=False, na=False)]
-        else:
-            dropoff_data = pd.DataFrame()
+            index = self.get_trip_index()
+            pickup_stats = lambda: index.pickup.stats(location)
+            dropoff_stats = lambda: index.dropoff.stats(location)
+        pickup = pickup_stats() if location_type in ['pickup', 'both'] else empty
+        dropoff = dropoff_stats() if location_type in ['dropoff', 'both'] else empty
         
         return {
-            'pickup_count': len(pickup_data),
-            'dropoff_count': len(dropoff_data),
-            'avg_group_size_pickup': pickup_data['Total Passengers'].mean() if len(pickup_data) > 0 else 0,
-            'avg_group_size_dropoff': dropoff_data['Total Passengers'].mean() if len(dropoff_data) > 0 else 0,
-            'peak_hours_pickup': pickup_data['hour'].mode().tolist() if len(pickup_data) > 0 else [],
-            'peak_hours_dropoff': dropoff_data['hour'].mode().tolist() if len(dropoff_data) > 0 else []
+            'pickup_count': pickup['count'],
+            'dropoff_count': dropoff['count'],
+            'avg_group_size_pickup': pickup['avg_group_size'],
+            'avg_group_size_dropoff': dropoff['avg_group_size'],
+            'peak_hours_pickup': pickup['peak_hours'],
+            'peak_hours_dropoff': dropoff['peak_hours']
+        }
+    
+    @staticmethod
+    def _aggregate_location_stats(location: str, trips: Counter, passengers: Counter) -> Dict[str, Any]:
+        """Combine the aggregate counts of every location name that contains the query."""
+        names = pd.Series(list(trips), dtype=object)
+        matches = names[names.str.contains(location, case=False, na=False)]
+        count = sum(trips[name] for name in matches)
+        return {
+            'count': count,
+            'avg_group_size': sum(passengers[name] for name in matches) / count if count > 0 else 0,
+            'peak_hours': []
         }
     
+    def get_trip_aggregates(self) -> TripAggregates:
+        """Get the running aggregates that every dashboard chart is built from."""
+        return self.aggregates
+    
+    def get_trip_cube(self) -> TripCube:
+        """Get the day x hour x group-size cube for the current data version."""
+        return self.aggregates.cube
+    
     def get_time_patterns(self, group_size_filter: int = None) -> Dict[str, Any]:
         """Get time-based patterns."""
-        data = self.df.copy()
-        
-        if group_size_filter:
-            data = data[data['Total Passengers'] >= group_size_filter]
+        counts = self.get_trip_cube().select(group_size_filter)
+        hourly = counts.sum(axis=(0, 2))
+        daily = counts.sum(axis=(1, 2))
+        by_category = pd.Series(hourly).groupby(self._categorize_time(pd.Series(np.arange(24)))).sum()
         
         return {
-            'hourly_counts': data['hour'].value_counts().sort_index().to_dict(),
-            'daily_counts': data['day_of_week'].value_counts().to_dict(),
-            'time_category_counts': data['time_category'].value_counts().to_dict()
+            'hourly_counts': {hour: int(count) for hour, count in enumerate(hourly) if count > 0},
+            'daily_counts': _ranked_counts(pd.Series(daily, index=DAY_NAMES)),
+            'time_category_counts': _ranked_counts(by_category)
         }
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""
+Figure caching for the Fetii analytics dashboard
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+import numpy as np
+import plotly.graph_objects as go
+import config
+
+# Trace properties that carry per-point data
+DATA_ARRAY_PROPERTIES = ('x', 'y', 'z', 'text', 'hovertext', 'customdata', 'labels', 'values')
+
+
+def freeze_params(params: Optional[Dict[str, Any]]) -> Tuple:
+    """Turn filter parameters into a hashable, order-independent cache key part."""
+    if not params:
+        return ()
+    return tuple(sorted((name, tuple(value) if isinstance(value, list) else value)
+                        for name, value in params.items() if value is not None))
+
+
+def estimate_figure_bytes(figure: go.Figure) -> int:
+    """Estimate a figure's size from its traces' data arrays, without serializing it."""
+    return sum(_value_bytes(getattr(trace, prop, None))
+               for trace in figure.data for prop in DATA_ARRAY_PROPERTIES)
+
+
+def _value_bytes(value) -> int:
+    """Approximate bytes held by a trace property value."""
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, np.ndarray) and value.dtype != object:
+        return value.nbytes
+    if isinstance(value, (np.ndarray, list, tuple)):
+        return sum(_value_bytes(item) for item in value)
+    return 8
+
+
+class FigureCache:
+    """
+    Thread-safe LRU cache of rendered Plotly figures.
+    
+    Entries are keyed by chart name, filter parameters and data version. Each
+    figure's data arrays count against the byte limit (the UI serializes the
+    figure itself, so the cache never does); least-recently-used figures are
+    evicted when either the entry or the byte limit is exceeded.
+    """
+    
+    def __init__(self, max_entries: int = None, max_bytes: int = None):
+        """Initialize an empty cache with limits defaulting to FIGURE_CACHE_CONFIG."""
+        settings = config.FIGURE_CACHE_CONFIG
+        self.max_entries = settings['max_entries'] if max_entries is None else max_entries
+        self.max_bytes = settings['max_bytes'] if max_bytes is None else max_bytes
+        
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get_or_build(self, name: str, params: Optional[Dict[str, Any]], data_version: int,
+                     build: Callable[[], go.Figure]) -> go.Figure:
+        """Get a figure, building it on a miss."""
+        key = (name, freeze_params(params), data_version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        
+        figure = build()
+        size = estimate_figure_bytes(figure)
+        
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size <= self.max_bytes:
+                self._entries[key] = (figure, size)
+                self._bytes += size
+                while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                    self._remove(next(iter(self._entries)))
+                    self.evictions += 1
+        return figure
+    
+    def clear(self):
+        """Drop every cached figure."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes
+            }
+    
+    def _remove(self, key: Hashable):
+        """Remove an entry and release its bytes."""
+        _, size = self._entries.pop(key)
+        self._bytes -= size
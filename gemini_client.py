@@ -0,0 +1,241 @@
+"""
+Pooled HTTP client for the Google Gemini API
+"""
+
+import asyncio
+import contextlib
+import json
+import threading
+import time
+import weakref
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+import config
+from resilience import CircuitBreaker, TokenBucket
+
+
+class GeminiClient:
+    """
+    Keep-alive, connection-pooled client for Gemini generateContent calls.
+    
+    One session is shared by every caller, so repeated chat turns reuse open
+    TCP/TLS connections instead of paying a new handshake per request.
+    """
+    
+    def __init__(self, base_url: str = None, model: str = None, pool_connections: int = None,
+                 pool_maxsize: int = None, connect_timeout: float = None, read_timeout: float = None):
+        """Initialize the client, with settings defaulting to GEMINI_CONFIG."""
+        settings = config.GEMINI_CONFIG
+        self.base_url = (base_url or settings['base_url']).rstrip('/')
+        self.model = model or settings['model']
+        self.connect_timeout = settings['connect_timeout'] if connect_timeout is None else connect_timeout
+        self.read_timeout = settings['read_timeout'] if read_timeout is None else read_timeout
+        self.pool_connections = settings['pool_connections'] if pool_connections is None else pool_connections
+        self.pool_maxsize = settings['pool_maxsize'] if pool_maxsize is None else pool_maxsize
+        
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=0
+        )
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Content-Type': 'application/json',
+            'Connection': 'keep-alive'
+        })
+        
+        # Shared by every chatbot using this client, since the quota is per backend
+        self.rate_limiter = TokenBucket()
+        self.breaker = CircuitBreaker()
+        self.health = HealthProbe(self.check_key)
+        
+        # httpx async clients are bound to the event loop that created them
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._async_lock = threading.Lock()
+    
+    def check_key(self, api_key: str) -> bool:
+        """Send a minimal request to check that Gemini accepts the key."""
+        test_payload = {
+            "contents": [
+                {
+                    "parts": [
+                        {"text": "Hi"}
+                    ]
+                }
+            ],
+            "generationConfig": {
+                "temperature": 0.7,
+                "maxOutputTokens": 10
+            }
+        }
+        
+        try:
+            response = self.generate_content(api_key, test_payload,
+                                             read_timeout=config.GEMINI_CONFIG['probe_read_timeout'])
+        except Exception as e:
+            print(f"⚠️ Failed to connect to Gemini AI: {str(e)}")
+            return False
+        
+        if response.status_code == 200:
+            print("✅ Gemini AI connected successfully")
+            return True
+        elif response.status_code == 429:
+            print("⚠️ Gemini API rate limit reached - falling back to pattern-based responses")
+        elif response.status_code == 400:
+            print("⚠️ Invalid Gemini API key or request")
+        else:
+            print(f"⚠️ Gemini AI connection failed: {response.status_code}")
+        return False
+    
+    def endpoint(self, method: str = 'generateContent') -> str:
+        """Get the URL of a model method."""
+        return f"{self.base_url}/models/{self.model}:{method}"
+    
+    def generate_content(self, api_key: str, payload: Dict[str, Any],
+                         read_timeout: Optional[float] = None) -> requests.Response:
+        """POST a generateContent request and return the raw response."""
+        return self.session.post(
+            self.endpoint(),
+            params={'key': api_key},
+            json=payload,
+            timeout=(self.connect_timeout, self.read_timeout if read_timeout is None else read_timeout)
+        )
+    
+    async def generate_content_async(self, api_key: str, payload: Dict[str, Any],
+                                     read_timeout: Optional[float] = None) -> httpx.Response:
+        """POST a generateContent request on the running event loop and return the raw response."""
+        return await self._get_async_client().post(
+            self.endpoint(),
+            params={'key': api_key},
+            json=payload,
+            timeout=httpx.Timeout(self.read_timeout if read_timeout is None else read_timeout,
+                                  connect=self.connect_timeout)
+        )
+    
+    @contextlib.asynccontextmanager
+    async def stream_generate_content(self, api_key: str, payload: Dict[str, Any],
+                                      read_timeout: Optional[float] = None) -> AsyncIterator[httpx.Response]:
+        """Open a streamGenerateContent request whose body arrives as Server-Sent Events."""
+        async with self._get_async_client().stream(
+            'POST',
+            self.endpoint('streamGenerateContent'),
+            params={'key': api_key, 'alt': 'sse'},
+            json=payload,
+            timeout=httpx.Timeout(self.read_timeout if read_timeout is None else read_timeout,
+                                  connect=self.connect_timeout)
+        ) as response:
+            yield response
+    
+    @staticmethod
+    async def iter_events(response: httpx.Response) -> AsyncIterator[Dict[str, Any]]:
+        """Yield each JSON event of a streaming response as it arrives."""
+        async for line in response.aiter_lines():
+            if line.startswith('data:'):
+                yield json.loads(line[5:])
+    
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Get the pooled async client for the running event loop, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = httpx.AsyncClient(
+                    headers={'Content-Type': 'application/json'},
+                    limits=httpx.Limits(max_connections=self.pool_maxsize,
+                                        max_keepalive_connections=self.pool_maxsize)
+                )
+                self._async_clients[loop] = client
+            return client
+    
+    async def aclose(self):
+        """Close the async client of the running event loop."""
+        with self._async_lock:
+            client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+    
+    def close(self):
+        """Close every pooled connection."""
+        self.session.close()
+
+
+class HealthProbe:
+    """
+    Background health check of Gemini API keys, cached per key with a TTL.
+    
+    Asking for a key's status never blocks: an unknown or stale key starts a
+    probe on a daemon thread (at most one in flight per key) and the last
+    known result, or None if there is none yet, is returned meanwhile.
+    """
+    
+    def __init__(self, check: Callable[[str], bool], ttl_seconds: float = None, failure_ttl_seconds: float = None):
+        """Initialize with a blocking check function and TTLs defaulting to GEMINI_CONFIG."""
+        settings = config.GEMINI_CONFIG
+        self.check = check
+        self.ttl_seconds = settings['health_ttl_seconds'] if ttl_seconds is None else ttl_seconds
+        self.failure_ttl_seconds = (settings['health_failure_ttl_seconds']
+                                    if failure_ttl_seconds is None else failure_ttl_seconds)
+        
+        self._results: Dict[str, tuple] = {}
+        self._in_flight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        
+        self.probes = 0
+    
+    def status(self, api_key: str) -> Optional[bool]:
+        """Get the last probe result for a key, refreshing it in the background when missing or stale."""
+        with self._lock:
+            entry = self._results.get(api_key)
+            if entry is None or time.monotonic() >= entry[1]:
+                self._start(api_key)
+            return entry[0] if entry is not None else None
+    
+    def wait(self, api_key: str, timeout: float = None) -> Optional[bool]:
+        """Block until the probe in flight for a key finishes, then get its status."""
+        with self._lock:
+            event = self._in_flight.get(api_key)
+        if event is not None:
+            event.wait(timeout)
+        with self._lock:
+            entry = self._results.get(api_key)
+            return entry[0] if entry is not None else None
+    
+    def _start(self, api_key: str):
+        """Start a probe for a key unless one is already running (lock held)."""
+        if api_key in self._in_flight:
+            return
+        
+        event = threading.Event()
+        self._in_flight[api_key] = event
+        self.probes += 1
+        threading.Thread(target=self._run, args=(api_key, event), name='gemini-health', daemon=True).start()
+    
+    def _run(self, api_key: str, event: threading.Event):
+        """Probe a key and cache the result."""
+        try:
+            healthy = bool(self.check(api_key))
+        except Exception:
+            healthy = False
+        
+        ttl = self.ttl_seconds if healthy else self.failure_ttl_seconds
+        with self._lock:
+            self._results[api_key] = (healthy, time.monotonic() + ttl)
+            del self._in_flight[api_key]
+        event.set()
+
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_shared_client() -> GeminiClient:
+    """Get the process-wide Gemini client, creating it on first use."""
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = GeminiClient()
+        return _shared_client
@@ -0,0 +1,89 @@
+"""
+Multi-pattern location name matching for Fetii AI Chatbot
+"""
+
+from collections import deque
+from typing import Iterable, List, Tuple
+
+
+class LocationMatcher:
+    """
+    Aho-Corasick automaton over known location names.
+    
+    Finds every known location mentioned in a piece of text in a single pass,
+    so the cost depends on the text length rather than the size of the catalog.
+    """
+    
+    def __init__(self, locations: Iterable[str]):
+        """Compile the automaton for a catalog of location names."""
+        self.goto = [{}]
+        self.fail = [0]
+        self.outputs: List[List[Tuple[str, int]]] = [[]]
+        
+        for location in sorted(set(locations)):
+            key = location.lower()
+            if not key:
+                continue
+            
+            node = 0
+            for char in key:
+                next_node = self.goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self.goto)
+                    self.goto[node][char] = next_node
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.outputs.append([])
+                node = next_node
+            self.outputs[node].append((location, len(key)))
+        
+        self._build_failure_links()
+    
+    def _build_failure_links(self):
+        """Link every state to its longest proper suffix state, breadth first."""
+        queue = deque(self.goto[0].values())
+        
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[child] = target if target != child else 0
+                
+                # Inherit matches that end at the suffix state
+                self.outputs[child] = self.outputs[child] + self.outputs[self.fail[child]]
+    
+    def find(self, text: str) -> List[str]:
+        """
+        Find the known locations mentioned in text.
+        
+        Matching is case-insensitive. When one match lies inside a longer one
+        (e.g. 'Campus' within 'West Campus') only the longer match is kept.
+        Results are ordered by where they appear in the text.
+        """
+        spans = []
+        node = 0
+        
+        for end, char in enumerate(text.lower(), start=1):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            for location, length in self.outputs[node]:
+                spans.append((end - length, end, location))
+        
+        kept = []
+        for start, end, location in sorted(spans, key=lambda span: span[0] - span[1]):
+            covered = any(other_start <= start and end <= other_end and other_end - other_start > end - start
+                          for other_start, other_end, _ in kept)
+            if not covered:
+                kept.append((start, end, location))
+        
+        found = []
+        for _, _, location in sorted(kept, key=lambda span: (span[0], span[0] - span[1])):
+            if location not in found:
+                found.append(location)
+        return found
@@ -0,0 +1,150 @@
+"""
+Client-side rate limiting and circuit breaking for the Gemini backend
+"""
+
+import random
+import threading
+import time
+from typing import Any, Dict
+import config
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket sized to the API quota.
+    
+    Tokens refill continuously at the quota rate up to the burst capacity;
+    each call takes one token or is rejected without waiting.
+    """
+    
+    def __init__(self, requests_per_minute: float = None, burst: int = None):
+        """Initialize a full bucket, with limits defaulting to RATE_LIMIT_CONFIG."""
+        settings = config.RATE_LIMIT_CONFIG
+        requests_per_minute = settings['requests_per_minute'] if requests_per_minute is None else requests_per_minute
+        self.rate = requests_per_minute / 60.0
+        self.capacity = settings['burst'] if burst is None else burst
+        
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+        
+        self.acquired = 0
+        self.rejections = 0
+    
+    def try_acquire(self) -> bool:
+        """Take one token if available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self.acquired += 1
+                return True
+            
+            self.rejections += 1
+            return False
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get acquisition and rejection counters."""
+        with self._lock:
+            return {
+                'acquired': self.acquired,
+                'rejections': self.rejections,
+                'tokens': round(self._tokens, 2),
+                'capacity': self.capacity
+            }
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit breaker with exponential backoff and jitter.
+    
+    Consecutive failures open the circuit, and calls are rejected until the
+    backoff elapses. A single trial call is then let through: success closes
+    the circuit, failure reopens it with double the backoff.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, failure_threshold: int = None, base_backoff: float = None,
+                 max_backoff: float = None, jitter: float = None):
+        """Initialize a closed breaker, with settings defaulting to CIRCUIT_BREAKER_CONFIG."""
+        settings = config.CIRCUIT_BREAKER_CONFIG
+        self.failure_threshold = settings['failure_threshold'] if failure_threshold is None else failure_threshold
+        self.base_backoff = settings['base_backoff_seconds'] if base_backoff is None else base_backoff
+        self.max_backoff = settings['max_backoff_seconds'] if max_backoff is None else max_backoff
+        self.jitter = settings['jitter'] if jitter is None else jitter
+        
+        self.state = self.CLOSED
+        self._failures = 0
+        self._consecutive_opens = 0
+        self._open_until = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        
+        self.rejections = 0
+        self.times_opened = 0
+    
+    def allow_request(self) -> bool:
+        """Check whether a call may go out now, moving from open to half-open once the backoff elapses."""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() >= self._open_until:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            
+            self.rejections += 1
+            return False
+    
+    def cancel_request(self):
+        """Give back an admitted call that was never sent, freeing a half-open trial."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trial_in_flight = False
+    
+    def record_success(self):
+        """Close the circuit after a successful call."""
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._consecutive_opens = 0
+            self._trial_in_flight = False
+    
+    def record_failure(self, trip: bool = False):
+        """Count a failed call, opening the circuit at the threshold, on a failed trial, or when trip is set."""
+        with self._lock:
+            self._failures += 1
+            if trip or self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._open()
+    
+    def _open(self):
+        """Open the circuit for an exponentially growing, jittered backoff."""
+        backoff = min(self.max_backoff, self.base_backoff * 2 ** self._consecutive_opens)
+        backoff *= 1 - self.jitter * random.random()
+        
+        self.state = self.OPEN
+        self._open_until = time.monotonic() + backoff
+        self._consecutive_opens += 1
+        self._failures = 0
+        self._trial_in_flight = False
+        self.times_opened += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get the breaker state and rejection counters."""
+        with self._lock:
+            return {
+                'state': self.state,
+                'rejections': self.rejections,
+                'times_opened': self.times_opened,
+                'retry_in_seconds': max(0.0, round(self._open_until - time.monotonic(), 1))
+                                    if self.state == self.OPEN else 0.0
+            }
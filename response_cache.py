@@ -0,0 +1,115 @@
+"""
+Response caching for Fetii AI Chatbot
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+import config
+
+
+def normalize_query(query: str) -> str:
+    """Normalize query text for cache lookups: lowercase with collapsed whitespace."""
+    return ' '.join(query.lower().split())
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU + TTL cache for chatbot responses, scoped to one data version.
+    
+    Entries are evicted least-recently-used first whenever either the entry
+    count or the total size in bytes exceeds its limit. Seeing a new data
+    version drops every entry computed from the old data.
+    """
+    
+    def __init__(self, max_entries: int = None, max_bytes: int = None, ttl_seconds: float = None):
+        """Initialize an empty cache with limits defaulting to RESPONSE_CACHE_CONFIG."""
+        settings = config.RESPONSE_CACHE_CONFIG
+        self.max_entries = settings['max_entries'] if max_entries is None else max_entries
+        self.max_bytes = settings['max_bytes'] if max_bytes is None else max_bytes
+        self.ttl_seconds = settings['ttl_seconds'] if ttl_seconds is None else ttl_seconds
+        
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._data_version = None
+        self._bytes = 0
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def get(self, key: Hashable, data_version: int) -> Optional[str]:
+        """Get a cached response, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._entries.get(key) if self._is_current(data_version) else None
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            response, size, expires_at = entry
+            if time.monotonic() >= expires_at:
+                self._remove(key)
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return response
+    
+    def put(self, key: Hashable, data_version: int, response: str):
+        """Store a response computed against the given data version."""
+        size = len(response.encode('utf-8')) + len(str(key).encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        
+        with self._lock:
+            if not self._is_current(data_version):
+                return
+            
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (response, size, time.monotonic() + self.ttl_seconds)
+            self._bytes += size
+            
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+    
+    def clear(self):
+        """Drop every cached response."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'data_version': self._data_version
+            }
+    
+    def _is_current(self, data_version: int) -> bool:
+        """Track the newest data version, dropping entries computed from older data."""
+        if self._data_version is None or data_version > self._data_version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._data_version = data_version
+        return data_version == self._data_version
+    
+    def _remove(self, key: Hashable):
+        """Remove an entry and release its bytes."""
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
@@ -0,0 +1,77 @@
+"""
+Per-session chatbot state for Fetii AI Chatbot
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+import config
+
+
+class SessionStore:
+    """
+    Thread-safe LRU + idle-TTL store of per-session state.
+    
+    Sessions untouched for longer than the idle TTL are dropped, oldest first,
+    on every access; the least-recently-used sessions are dropped whenever
+    the store grows past max_sessions, so memory stays bounded however long
+    the server runs.
+    """
+    
+    def __init__(self, max_sessions: int = None, idle_ttl_seconds: float = None):
+        """Initialize an empty store with limits defaulting to SESSION_CONFIG."""
+        settings = config.SESSION_CONFIG
+        self.max_sessions = settings['max_sessions'] if max_sessions is None else max_sessions
+        self.idle_ttl_seconds = settings['idle_ttl_seconds'] if idle_ttl_seconds is None else idle_ttl_seconds
+        
+        self._sessions: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+    
+    def get(self, session_id: Hashable, create: Callable[[], Any]) -> Any:
+        """Get the state of a session, creating it on first use."""
+        with self._lock:
+            now = time.monotonic()
+            self._expire_idle(now)
+            
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                state = create()
+                self.created += 1
+            else:
+                state = entry[0]
+                self._sessions.move_to_end(session_id)
+            self._sessions[session_id] = (state, now)
+            
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+            return state
+    
+    def clear(self):
+        """Drop every session."""
+        with self._lock:
+            self._sessions.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get the number of live sessions and lifetime counters."""
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'created': self.created,
+                'expired': self.expired,
+                'evicted': self.evicted
+            }
+    
+    def _expire_idle(self, now: float):
+        """Drop sessions idle for longer than the TTL, starting from the least recently used."""
+        while self._sessions:
+            session_id, (_, last_seen) = next(iter(self._sessions.items()))
+            if now - last_seen < self.idle_ttl_seconds:
+                break
+            del self._sessions[session_id]
+            self.expired += 1
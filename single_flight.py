@@ -0,0 +1,118 @@
+"""
+Request coalescing for Fetii AI Chatbot
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class FlightAbandoned(Exception):
+    """The leader was cancelled before finishing; waiters should start the flight again."""
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent computations of the same key into one.
+    
+    The first caller for a key becomes the leader and runs the computation;
+    callers arriving while it is in flight wait for and share its result.
+    If the leader is cancelled, its waiters retry and one of them takes over.
+    Completed keys are forgotten, so caching stays the job of ResponseCache.
+    Works across threads and event loops, since waiters share a
+    concurrent.futures.Future.
+    """
+    
+    def __init__(self):
+        """Initialize with nothing in flight."""
+        self._flights: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        
+        self.leaders = 0
+        self.coalesced = 0
+        self.abandoned = 0
+    
+    def begin(self, key: Hashable) -> Tuple[Future, bool]:
+        """Join the flight for key, returning its future and whether this caller leads it."""
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            
+            future = Future()
+            self._flights[key] = future
+            self.leaders += 1
+            return future, True
+    
+    def finish(self, key: Hashable, future: Future, result: Any = None, error: BaseException = None):
+        """Publish the leader's result (or error) to every waiter and close the flight."""
+        with self._lock:
+            if self._flights.get(key) is future:
+                del self._flights[key]
+        
+        if error is not None and not isinstance(error, Exception):
+            # The leader was cancelled or abandoned, which says nothing about the waiters' requests
+            with self._lock:
+                self.abandoned += 1
+            error = FlightAbandoned(f"Coalesced computation was interrupted: {type(error).__name__}")
+        
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    
+    def run(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Run compute once for all concurrent callers with the same key."""
+        while True:
+            future, leader = self.begin(key)
+            if leader:
+                break
+            try:
+                return future.result()
+            except FlightAbandoned:
+                continue
+        
+        try:
+            result = compute()
+        except BaseException as e:
+            self.finish(key, future, error=e)
+            raise
+        self.finish(key, future, result)
+        return result
+    
+    async def run_async(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Await compute once for all concurrent callers with the same key."""
+        while True:
+            future, leader = self.begin(key)
+            if leader:
+                break
+            try:
+                return await self.wait_async(future)
+            except FlightAbandoned:
+                continue
+        
+        try:
+            result = await compute()
+        except BaseException as e:
+            self.finish(key, future, error=e)
+            raise
+        self.finish(key, future, result)
+        return result
+    
+    @staticmethod
+    async def wait_async(future: Future) -> Any:
+        """Await another caller's flight from an event loop."""
+        # Shielded so a cancelled waiter cannot cancel the shared future
+        return await asyncio.shield(asyncio.wrap_future(future))
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get leader/coalesced counters and the number of flights in progress."""
+        with self._lock:
+            return {
+                'leaders': self.leaders,
+                'coalesced': self.coalesced,
+                'abandoned': self.abandoned,
+                'in_flight': len(self._flights)
+            }
@@ -0,0 +1,65 @@
+"""
+Tests for the running trip aggregates in DataProcessor
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_processor import DataProcessor
+
+
+def raw_trip(trip_id: int, timestamp: str, passengers: int = 6) -> dict:
+    """One raw trip in the CSV layout."""
+    return {
+        'Trip ID': trip_id,
+        'Booking User ID': 1000 + trip_id,
+        'Pick Up Latitude': 30.28,
+        'Pick Up Longitude': -97.74,
+        'Drop Off Latitude': 30.26,
+        'Drop Off Longitude': -97.74,
+        'Pick Up Address': "West Campus, Austin, TX",
+        'Drop Off Address': "Rainey Street Bar, 80 Rainey St, Austin, TX",
+        'Trip Date and Time': timestamp,
+        'Total Passengers': passengers
+    }
+
+
+class AppendAggregatesTest(unittest.TestCase):
+    """
+    Appending trips keeps the aggregates equal to recomputing them from the whole table.
+    """
+    
+    def load(self, compact_schema: bool) -> DataProcessor:
+        trips = [raw_trip(i, f"9/{1 + i % 5}/25 {i % 24}:00") for i in range(40)]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'trips.csv')
+            pd.DataFrame(trips).to_csv(path, index=False)
+            return DataProcessor(path, use_snapshot=False, compact_schema=compact_schema, streaming=False)
+    
+    def test_daily_counts_after_append(self):
+        for compact_schema in (False, True):
+            dp = self.load(compact_schema)
+            # Two days already loaded and one new day
+            dp.append_trips([raw_trip(100, "9/1/25 22:00"), raw_trip(101, "9/2/25 23:00"),
+                             raw_trip(102, "9/9/25 21:00")])
+            
+            days = pd.to_datetime(pd.Series(dp.df['date'])).nunique()
+            self.assertEqual(len(dp.aggregates.daily), days)
+            self.assertEqual(days, 6)
+            self.assertEqual(sum(dp.aggregates.daily.values()), len(dp.df))
+            self.assertEqual(dp.aggregates.daily[pd.Timestamp('2025-09-01')], 9)
+    
+    def test_daily_keys_match_filtered_aggregates(self):
+        dp = self.load(compact_schema=True)
+        dp.append_trips([raw_trip(100, "9/1/25 22:00")])
+        filtered = dp.get_filtered_aggregates({'min_passengers': 1})
+        self.assertEqual(dict(filtered.daily), dict(dp.aggregates.daily))
+
+
+if __name__ == '__main__':
+    unittest.main()
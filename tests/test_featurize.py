@@ -0,0 +1,161 @@
+"""
+Equivalence tests for the vectorized feature extraction in DataProcessor
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_processor import DataProcessor
+
+
+# Per-row implementations the vectorized features replaced, kept as the reference
+def reference_main_location(address) -> str:
+    if pd.isna(address):
+        return "Unknown"
+    return address.split(',')[0].strip()
+
+
+def reference_time_category(hour: int) -> str:
+    if 6 <= hour < 12:
+        return "Morning"
+    elif 12 <= hour < 17:
+        return "Afternoon"
+    elif 17 <= hour < 21:
+        return "Evening"
+    elif 21 <= hour <= 23:
+        return "Night"
+    else:
+        return "Late Night"
+
+
+def reference_group_category(passengers: int) -> str:
+    if passengers <= 4:
+        return "Small (1-4)"
+    elif passengers <= 8:
+        return "Medium (5-8)"
+    elif passengers <= 12:
+        return "Large (9-12)"
+    else:
+        return "Extra Large (13+)"
+
+
+def reference_is_entertainment(location: str) -> bool:
+    entertainment_keywords = ['bar', 'club', 'lounge', 'aquarium', 'rooftop', 'social', 'pub']
+    return any(keyword in location.lower() for keyword in entertainment_keywords)
+
+
+def reference_is_campus(location: str) -> bool:
+    campus_keywords = ['campus', 'university', 'drag', 'west campus']
+    return any(keyword in location.lower() for keyword in campus_keywords)
+
+
+ADDRESSES = [
+    "Rainey Street Bar, 80 Rainey St, Austin, TX",
+    "West Campus, Austin, TX",
+    "  The Drag  , Guadalupe St",
+    "No Comma Rooftop",
+    "Pub",
+    "",
+    "   ",
+    ",Leading comma",
+    np.nan,
+    "University of Texas, Austin",
+    "Aquarium on 6th, 403 E 6th St",
+    "CLUB CAPS, Austin"
+]
+
+# Every hour, and every passenger count around the group-size bin edges
+HOURS = list(range(24))
+PASSENGERS = [1, 4, 5, 8, 9, 12, 13, 14, 20]
+
+
+class FeaturizeEquivalenceTest(unittest.TestCase):
+    """
+    Compare the vectorized features with the per-row reference on raw trips loaded from CSV.
+    """
+    
+    @classmethod
+    def setUpClass(cls):
+        rows = []
+        for i in range(max(len(ADDRESSES), len(HOURS), len(PASSENGERS)) * 3):
+            rows.append({
+                'Trip ID': i,
+                'Booking User ID': 1000 + i,
+                'Pick Up Latitude': 30.28,
+                'Pick Up Longitude': -97.74,
+                'Drop Off Latitude': 30.26,
+                'Drop Off Longitude': -97.74,
+                'Pick Up Address': ADDRESSES[i % len(ADDRESSES)],
+                'Drop Off Address': ADDRESSES[(i * 5 + 3) % len(ADDRESSES)],
+                'Trip Date and Time': f"9/{1 + i % 7}/25 {HOURS[i % len(HOURS)]}:{i % 60:02d}",
+                'Total Passengers': PASSENGERS[i % len(PASSENGERS)]
+            })
+        # Rows without passengers or a timestamp are dropped by cleaning
+        rows.append(dict(rows[0], **{'Trip ID': 9998, 'Total Passengers': np.nan}))
+        rows.append(dict(rows[0], **{'Trip ID': 9999, 'Trip Date and Time': np.nan}))
+        
+        cls.raw = pd.DataFrame(rows)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'trips.csv')
+            cls.raw.to_csv(path, index=False)
+            # Read back through CSV, so empty addresses arrive as NaN just as they do in production
+            cls.raw = pd.read_csv(path)
+            cls.df = DataProcessor(path, use_snapshot=False, compact_schema=False, streaming=False).df
+    
+    def test_cleaning_drops_incomplete_rows(self):
+        self.assertEqual(len(self.df), len(self.raw) - 2)
+        self.assertNotIn(9998, self.df['Trip ID'].tolist())
+        self.assertNotIn(9999, self.df['Trip ID'].tolist())
+    
+    def test_main_locations(self):
+        for address_col, main_col in [('Pick Up Address', 'pickup_main'), ('Drop Off Address', 'dropoff_main')]:
+            raw = self.raw.set_index('Trip ID').loc[self.df['Trip ID'], address_col]
+            expected = [reference_main_location(address) for address in raw]
+            self.assertEqual(self.df[main_col].tolist(), expected)
+    
+    def test_time_categories(self):
+        expected = [reference_time_category(hour) for hour in self.df['hour']]
+        self.assertEqual(self.df['time_category'].tolist(), expected)
+        self.assertEqual(set(self.df['hour']), set(HOURS))
+    
+    def test_group_categories_at_bin_edges(self):
+        expected = [reference_group_category(passengers) for passengers in self.df['Total Passengers']]
+        self.assertEqual(self.df['group_category'].tolist(), expected)
+        self.assertTrue(set(PASSENGERS) <= set(self.df['Total Passengers']))
+    
+    def test_keyword_flags(self):
+        self.assertEqual(self.df['is_entertainment'].tolist(),
+                         [reference_is_entertainment(location) for location in self.df['dropoff_main']])
+        self.assertEqual(self.df['is_campus'].tolist(),
+                         [reference_is_campus(location) for location in self.df['pickup_main']])
+    
+    
+    def test_all_missing_addresses(self):
+        # With no address at all the CSV column is read as float64 NaN
+        raw = self.raw.assign(**{'Pick Up Address': np.nan, 'Drop Off Address': np.nan})
+        for streaming in (False, True):
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'trips.csv')
+                raw.to_csv(path, index=False)
+                dp = DataProcessor(path, use_snapshot=False, compact_schema=False, streaming=streaming)
+            self.assertEqual(dict(dp.aggregates.pickups), {'Unknown': len(self.df)})
+            self.assertEqual(dict(dp.aggregates.dropoffs), {'Unknown': len(self.df)})
+    
+    def test_append_batch_without_addresses(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'trips.csv')
+            self.raw.to_csv(path, index=False)
+            dp = DataProcessor(path, use_snapshot=False, compact_schema=False, streaming=False)
+        row = dict(self.raw.iloc[0], **{'Trip ID': 10000, 'Pick Up Address': np.nan, 'Drop Off Address': np.nan})
+        self.assertEqual(dp.append_trips([row]), 1)
+        self.assertEqual(dp.df[['pickup_main', 'dropoff_main']].iloc[-1].tolist(), ['Unknown', 'Unknown'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+Tests for request coalescing in SingleFlight
+"""
+
+import os
+import sys
+import asyncio
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from single_flight import SingleFlight
+
+
+class SingleFlightAsyncTest(unittest.TestCase):
+    """
+    Followers share the leader's result, retry when the leader is cancelled and see its real errors.
+    """
+    
+    def test_followers_share_result(self):
+        async def main():
+            flights = SingleFlight()
+            calls = []
+            
+            async def compute():
+                calls.append(1)
+                await asyncio.sleep(0.05)
+                return 'answer'
+            
+            results = await asyncio.gather(*(flights.run_async('q', compute) for _ in range(3)))
+            return results, calls, flights.stats()
+        
+        results, calls, stats = asyncio.run(main())
+        self.assertEqual(results, ['answer'] * 3)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(stats['coalesced'], 2)
+    
+    def test_cancelled_leader_hands_over(self):
+        async def main():
+            flights = SingleFlight()
+            calls = []
+            
+            async def compute():
+                calls.append(1)
+                await asyncio.sleep(0.1)
+                return 'answer'
+            
+            leader = asyncio.create_task(flights.run_async('q', compute))
+            await asyncio.sleep(0.01)
+            followers = [asyncio.create_task(flights.run_async('q', compute)) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            
+            results = await asyncio.gather(*followers)
+            return leader, results, calls, flights.stats()
+        
+        leader, results, calls, stats = asyncio.run(main())
+        self.assertTrue(leader.cancelled())
+        self.assertEqual(results, ['answer', 'answer'])
+        # One follower took over the flight and the other joined it
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(stats['abandoned'], 1)
+        self.assertEqual(stats['in_flight'], 0)
+    
+    def test_errors_reach_followers(self):
+        async def main():
+            flights = SingleFlight()
+            
+            async def compute():
+                await asyncio.sleep(0.05)
+                raise ValueError('bad data')
+            
+            return await asyncio.gather(*(flights.run_async('q', compute) for _ in range(2)),
+                                        return_exceptions=True)
+        
+        results = asyncio.run(main())
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+"""
+Tests for trip data validation
+"""
+
+import os
+import sys
+import unittest
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_processor import DataProcessor
+from utils import validate_data
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fetii_data.csv')
+
+
+class ValidateDataTest(unittest.TestCase):
+    """
+    The processed trip table validates under both schemas.
+    """
+    
+    def test_processed_tables_are_valid(self):
+        for compact_schema in (False, True):
+            df = DataProcessor(DATA_PATH, use_snapshot=False, compact_schema=compact_schema, streaming=False).df
+            self.assertEqual(validate_data(df), (True, []))
+    
+    def test_compact_table_still_needs_timestamps(self):
+        df = DataProcessor(DATA_PATH, use_snapshot=False, compact_schema=True, streaming=False).df
+        valid, issues = validate_data(df.drop(columns=['datetime']))
+        self.assertFalse(valid)
+        self.assertEqual(issues, ["Missing required columns: Trip Date and Time"])
+        
+        df.loc[df.index[0], 'datetime'] = pd.NaT
+        self.assertEqual(validate_data(df), (False, ["Found 1 trips without a timestamp"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
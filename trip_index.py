@@ -0,0 +1,183 @@
+"""
+Row indexes over the processed trip table for Fetii AI Chatbot
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Any
+
+
+class _Postings:
+    """
+    Row ids grouped by a small integer key, stored as one permutation plus offsets.
+    """
+    
+    def __init__(self, keys: np.ndarray, num_keys: int):
+        """Group row ids by key."""
+        self.order = np.argsort(keys, kind='stable')
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(keys, minlength=num_keys))))
+    
+    def rows_between(self, first_key: int, last_key: int) -> np.ndarray:
+        """Get sorted row ids for every key in the inclusive range."""
+        first_key = max(first_key, 0)
+        last_key = min(last_key, len(self.offsets) - 2)
+        if first_key > last_key:
+            return np.empty(0, dtype=self.order.dtype)
+        return np.sort(self.order[self.offsets[first_key]:self.offsets[last_key + 1]])
+    
+    def rows_for(self, keys: np.ndarray) -> np.ndarray:
+        """Get sorted row ids for a set of keys."""
+        if len(keys) == 0:
+            return np.empty(0, dtype=self.order.dtype)
+        return np.sort(np.concatenate([self.order[self.offsets[key]:self.offsets[key + 1]] for key in keys]))
+
+
+class _Predicate:
+    """
+    One filter that can list its matching rows or test a given set of rows.
+    """
+    
+    def __init__(self, count: int, rows, test):
+        """Wrap a filter's estimated match count with its row lookup and row test."""
+        self.count = count
+        self.rows = rows
+        self.test = test
+
+
+class LocationColumn:
+    """
+    Distinct location names of one column with a posting list and trip stats per name.
+    """
+    
+    def __init__(self, values: pd.Series, hours: np.ndarray, passengers: np.ndarray):
+        """Factorize the column and precompute per-location rows, counts and hour histograms."""
+        self.codes, names = pd.factorize(values, use_na_sentinel=False)
+        self.names = pd.Series(np.asarray(names, dtype=object))
+        self.postings = _Postings(self.codes, len(names))
+        
+        self.trip_counts = np.diff(self.postings.offsets)
+        self.passenger_sums = np.bincount(self.codes, weights=passengers, minlength=len(names))
+        self.hour_histograms = np.bincount(self.codes * 24 + hours,
+                                           minlength=len(names) * 24).reshape(len(names), 24)
+    
+    def matching_codes(self, location: str, regex: bool = True) -> np.ndarray:
+        """Get the codes of names that contain the query, with str.contains semantics (literally unless regex)."""
+        return np.flatnonzero(self.names.str.contains(location, case=False, na=False, regex=regex).to_numpy())
+    
+    def predicate(self, location: str) -> _Predicate:
+        """Build a filter for rows whose location contains the query."""
+        codes = self.matching_codes(location)
+        matches = np.zeros(len(self.names), dtype=bool)
+        matches[codes] = True
+        return _Predicate(int(self.trip_counts[codes].sum()),
+                          lambda: self.postings.rows_for(codes),
+                          lambda rows: matches[self.codes[rows]])
+    
+    def stats(self, location: str) -> Dict[str, Any]:
+        """Combine the precomputed stats of every name that contains the query."""
+        codes = self.matching_codes(location)
+        count = int(self.trip_counts[codes].sum())
+        hour_histogram = self.hour_histograms[codes].sum(axis=0)
+        return {
+            'count': count,
+            'avg_group_size': self.passenger_sums[codes].sum() / count if count > 0 else 0,
+            'peak_hours': np.flatnonzero(hour_histogram == hour_histogram.max()).tolist() if count > 0 else []
+        }
+
+
+class TripIndex:
+    """
+    Read-only indexes over one version of the trip table.
+    
+    Each query is planned once: a selective filter is answered from its index
+    and the others are tested on those rows only; otherwise every filter is
+    folded into a single boolean mask. Rows are materialized once at the end.
+    """
+    
+    # Start from an index lookup when it narrows the table to this fraction or less
+    SELECTIVE_FRACTION = 1 / 32
+    
+    def __init__(self, df: pd.DataFrame):
+        """Build the location, hour and datetime indexes for a processed frame."""
+        self.df = df
+        self.num_rows = len(df)
+        
+        self.hours = df['hour'].to_numpy(dtype=np.int64)
+        self.hour_postings = _Postings(self.hours, 24)
+        self.passengers = df['Total Passengers'].to_numpy()
+        self.pickup = LocationColumn(df['pickup_main'], self.hours, self.passengers)
+        self.dropoff = LocationColumn(df['dropoff_main'], self.hours, self.passengers)
+        
+        self.datetimes = df['datetime'].to_numpy()
+        self.datetime_order = np.argsort(self.datetimes, kind='stable')
+        self.sorted_datetimes = self.datetimes[self.datetime_order]
+    
+    def _hour_predicate(self, start_hour, end_hour) -> _Predicate:
+        """Build a filter for trips whose hour lies in the inclusive range."""
+        first, last = max(int(np.ceil(start_hour)), 0), min(int(np.floor(end_hour)), 23)
+        allowed = np.zeros(24, dtype=bool)
+        if first <= last:
+            allowed[first:last + 1] = True
+        offsets = self.hour_postings.offsets
+        count = int(offsets[last + 1] - offsets[first]) if first <= last else 0
+        return _Predicate(count,
+                          lambda: self.hour_postings.rows_between(first, last),
+                          lambda rows: allowed[self.hours[rows]])
+    
+    def _date_predicate(self, start_date, end_date) -> _Predicate:
+        """Build a filter for trips on calendar days from start_date to end_date inclusive."""
+        start = np.datetime64(pd.Timestamp(start_date).normalize())
+        stop = np.datetime64(pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1))
+        low, high = np.searchsorted(self.sorted_datetimes, [start, stop], side='left')
+        return _Predicate(int(max(high - low, 0)),
+                          lambda: np.sort(self.datetime_order[low:high]),
+                          lambda rows: (self.datetimes[rows] >= start) & (self.datetimes[rows] < stop))
+    
+    def _passenger_predicate(self, query_params: Dict[str, Any]) -> _Predicate:
+        """Build a filter for the passenger bounds (scan only, no index)."""
+        def test(rows):
+            passengers = self.passengers[rows]
+            keep = np.ones(len(passengers), dtype=bool)
+            if 'min_passengers' in query_params:
+                keep &= passengers >= query_params['min_passengers']
+            if 'max_passengers' in query_params:
+                keep &= passengers <= query_params['max_passengers']
+            return keep
+        return _Predicate(self.num_rows, None, test)
+    
+    def query(self, query_params: Dict[str, Any]) -> np.ndarray:
+        """Get the sorted row positions that satisfy every filter in query_params."""
+        predicates = []
+        
+        if 'pickup_location' in query_params:
+            predicates.append(self.pickup.predicate(query_params['pickup_location']))
+        
+        if 'dropoff_location' in query_params:
+            predicates.append(self.dropoff.predicate(query_params['dropoff_location']))
+        
+        if 'hour_range' in query_params:
+            predicates.append(self._hour_predicate(*query_params['hour_range']))
+        
+        if 'date_range' in query_params:
+            predicates.append(self._date_predicate(*query_params['date_range']))
+        
+        if 'min_passengers' in query_params or 'max_passengers' in query_params:
+            predicates.append(self._passenger_predicate(query_params))
+        
+        if not predicates:
+            return np.arange(self.num_rows)
+        
+        predicates.sort(key=lambda predicate: predicate.count)
+        driver = predicates[0]
+        
+        if driver.rows is not None and driver.count <= self.num_rows * self.SELECTIVE_FRACTION:
+            rows = driver.rows()
+            for predicate in predicates[1:]:
+                rows = rows[predicate.test(rows)]
+            return rows
+        
+        all_rows = slice(None)
+        mask = predicates[0].test(all_rows)
+        for predicate in predicates[1:]:
+            mask &= predicate.test(all_rows)
+        return np.flatnonzero(mask)
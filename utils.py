@@ -2,13 +2,25 @@
 Utility functions for Fetii AI Chatbot
 """
 
+import gzip
+import io
+import os
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
 import re
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Iterator, Tuple, Optional
 import config
 
+# Streaming formats of the export engine
+EXPORT_STREAM_FORMATS = ('csv', 'ndjson', 'parquet')
+
+# Large exports run here so they never hold up request handling
+_export_executor = ThreadPoolExecutor(max_workers=config.EXPORT_CONFIG['workers'], thread_name_prefix='export')
+
 def clean_location_name(location: str) -> str:
     """Clean and standardize location names."""
     if pd.isna(location) or not location:
@@ -151,8 +163,10 @@ def validate_data(data: pd.DataFrame) -> Tuple[bool, List[str]]:
     """Validate data quality and return issues found."""
     issues = []
     
-    required_columns = ['Trip ID', 'Total Passengers', 'Trip Date and Time']
-    missing_columns = [col for col in required_columns if col not in data.columns]
+    required_columns = config.VALIDATION_RULES['required_fields']
+    replacements = config.VALIDATION_RULES['field_replacements']
+    missing_columns = [col for col in required_columns
+                       if col not in data.columns and replacements.get(col) not in data.columns]
     if missing_columns:
         issues.append(f"Missing required columns: {', '.join(missing_columns)}")
     
@@ -176,6 +190,11 @@ def validate_data(data: pd.DataFrame) -> Tuple[bool, List[str]]:
                 invalid_dates += 1
         if invalid_dates > 0:
             issues.append(f"Found {invalid_dates} trips with invalid date formats")
+    elif 'datetime' in data.columns:
+        # Compact trip tables keep only the parsed timestamps
+        missing_dates = int(data['datetime'].isna().sum())
+        if missing_dates > 0:
+            issues.append(f"Found {missing_dates} trips without a timestamp")
     
     if 'Trip ID' in data.columns:
         duplicates = data['Trip ID'].duplicated().sum()
@@ -185,21 +204,27 @@ def validate_data(data: pd.DataFrame) -> Tuple[bool, List[str]]:
     return len(issues) == 0, issues
 
 def create_export_data(data: pd.DataFrame, insights: Dict[str, Any], format_type: str = 'csv') -> Any:
-    """Create data for export in specified format."""
+    """Create data for export in specified format, limited to EXPORT_CONFIG['max_export_rows'] rows."""
+    exported = _limit_export_rows(data, config.EXPORT_CONFIG['max_export_rows'])
+    
     if format_type == 'csv':
-        return data.to_csv(index=False)
+        return b''.join(iter_export(exported, 'csv', compression='none')).decode('utf-8')
     
     elif format_type == 'json':
         export_data = {
             'metadata': {
                 'export_date': datetime.now().isoformat(),
                 'total_records': len(data),
+                'exported_records': len(exported),
                 'insights': insights
             },
-            'data': data.to_dict('records')
+            'data': exported.to_dict('records')
         }
         return export_data
     
+    elif format_type in EXPORT_STREAM_FORMATS:
+        return b''.join(iter_export(exported, format_type))
+    
     elif format_type == 'summary':
         summary = create_summary_stats(data)
         return summary
@@ -207,6 +232,117 @@ def create_export_data(data: pd.DataFrame, insights: Dict[str, Any], format_type
     else:
         raise ValueError(f"Unsupported export format: {format_type}")
 
+def iter_export(data: pd.DataFrame, format_type: str = 'csv', compression: Optional[str] = None,
+                max_rows: Optional[int] = None, chunk_rows: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Stream trip data as CSV, NDJSON or Parquet bytes, one chunk of rows at a time.
+    
+    Only one chunk is ever encoded in memory. Compression defaults to
+    EXPORT_CONFIG['compression']: 'gzip' wraps CSV and NDJSON in a gzip stream
+    and becomes the column codec for Parquet; 'none' writes plain output.
+    At most max_rows rows (default EXPORT_CONFIG['max_export_rows']) are written.
+    """
+    if format_type not in EXPORT_STREAM_FORMATS:
+        raise ValueError(f"Unsupported export format: {format_type}")
+    
+    settings = config.EXPORT_CONFIG
+    compression = settings['compression'] if compression is None else compression
+    data = _limit_export_rows(data, settings['max_export_rows'] if max_rows is None else max_rows)
+    chunk_rows = chunk_rows or settings['chunk_rows']
+    chunks = (data.iloc[start:start + chunk_rows] for start in range(0, max(len(data), 1), chunk_rows))
+    return _stream_chunks(chunks, format_type, compression)
+
+def export_to_file(data: pd.DataFrame, path: str, format_type: str = 'csv', compression: Optional[str] = None,
+                   max_rows: Optional[int] = None, chunk_rows: Optional[int] = None) -> Dict[str, Any]:
+    """Stream an export into a file, replacing it only once the export is complete."""
+    rows = min(len(data), config.EXPORT_CONFIG['max_export_rows'] if max_rows is None else max_rows)
+    size = 0
+    with open(path + '.tmp', 'wb') as f:
+        for chunk in iter_export(data, format_type, compression, max_rows, chunk_rows):
+            f.write(chunk)
+            size += len(chunk)
+    os.replace(path + '.tmp', path)
+    
+    return {
+        'path': path,
+        'format': format_type,
+        'rows': rows,
+        'bytes': size,
+        'truncated': rows < len(data)
+    }
+
+def submit_export(data: pd.DataFrame, path: str, format_type: str = 'csv', compression: Optional[str] = None,
+                  max_rows: Optional[int] = None, chunk_rows: Optional[int] = None) -> Future:
+    """Run export_to_file on the export worker thread, returning a future of its result."""
+    return _export_executor.submit(export_to_file, data, path, format_type, compression, max_rows, chunk_rows)
+
+def _limit_export_rows(data: pd.DataFrame, max_rows: int) -> pd.DataFrame:
+    """Cut data down to the export row limit."""
+    if len(data) <= max_rows:
+        return data
+    print(f"⚠️ Export limited to {max_rows:,} of {len(data):,} rows")
+    return data.iloc[:max_rows]
+
+def _stream_chunks(chunks: Iterator[pd.DataFrame], format_type: str, compression: Optional[str]) -> Iterator[bytes]:
+    """Encode row chunks in the given format, yielding the bytes written for each one."""
+    sink = _ChunkSink()
+    
+    if format_type == 'parquet':
+        writer = None
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, schema=writer.schema if writer else None, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(sink, table.schema, compression=compression)
+            writer.write_table(table)
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+        return
+    
+    stream = (gzip.GzipFile(fileobj=sink, mode='wb', compresslevel=config.EXPORT_CONFIG['compression_level'])
+              if compression == 'gzip' else sink)
+    for i, chunk in enumerate(chunks):
+        if format_type == 'csv':
+            text = chunk.to_csv(index=False, header=i == 0)
+        else:
+            text = chunk.to_json(orient='records', lines=True, date_format='iso') if len(chunk) else ''
+        stream.write(text.encode('utf-8'))
+        yield sink.drain()
+    
+    if stream is not sink:
+        stream.close()
+        yield sink.drain()
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file object that hands out what was written since the last drain.
+    """
+    
+    def __init__(self):
+        """Start with nothing written."""
+        self._parts = []
+        self._position = 0
+    
+    def writable(self) -> bool:
+        """Accept writes."""
+        return True
+    
+    def write(self, data) -> int:
+        """Buffer written bytes until the next drain."""
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        """Get the total number of bytes written, as Parquet footers need it."""
+        return self._position
+    
+    def drain(self) -> bytes:
+        """Take the bytes written since the last drain."""
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
 def search_locations(query: str, locations: List[str], max_results: int = 5) -> List[str]:
     """Search for locations matching a query."""
     query_lower = query.lower()
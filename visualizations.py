@@ -1,36 +1,221 @@
+import hashlib
+import pickle
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
-from typing import Dict, Any
-from data_processor import DataProcessor
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from data_processor import DataProcessor, TripAggregates, TripCube
+from figure_cache import FigureCache
+import config
 
-def create_visualizations(data_processor: DataProcessor) -> Dict[str, Any]:
+# Inputs of each dashboard chart, taken from a set of (possibly filtered) trip aggregates
+CHART_INPUTS: Dict[str, Callable[[TripAggregates], tuple]] = {
+    # Core visualizations
+    'hourly_distribution': lambda agg: (dict(sorted(agg.hourly.items())),),
+    'group_size_distribution': lambda agg: (dict(sorted(agg.group_sizes.items())),),
+    'popular_locations': lambda agg: (agg.pickups.most_common(10),),
+    
+    # Advanced visualizations
+    'time_heatmap': lambda agg: (agg.cube,),
+    'daily_volume': lambda agg: (agg.daily,),
+    'trip_distance_analysis': lambda agg: (agg.distance_moments,),
+    'location_comparison': lambda agg: (agg.pickups.most_common(10), agg.dropoffs.most_common(10)),
+    'peak_patterns': lambda agg: (agg.cube,)
+}
+
+# Dashboard charts by name, each built from its inputs on demand
+CHART_BUILDERS: Dict[str, Callable[..., go.Figure]] = {
+    'hourly_distribution': lambda hourly: create_hourly_chart(hourly),
+    'group_size_distribution': lambda group_sizes: create_group_size_chart(group_sizes),
+    'popular_locations': lambda top_pickups: create_locations_chart(top_pickups),
+    'time_heatmap': lambda cube: create_time_heatmap(cube),
+    'daily_volume': lambda daily: create_daily_volume_chart(daily),
+    'trip_distance_analysis': lambda distance_moments: create_distance_analysis(distance_moments),
+    'location_comparison': lambda top_pickups, top_dropoffs: create_location_comparison(top_pickups, top_dropoffs),
+    'peak_patterns': lambda cube: create_peak_patterns(cube)
+}
+
+# Titles of the placeholders shown when no trips match the dashboard filters
+CHART_TITLES: Dict[str, str] = {
+    'hourly_distribution': 'Trip Distribution by Hour',
+    'group_size_distribution': 'Group Size Distribution',
+    'popular_locations': 'Top Pickup Locations',
+    'time_heatmap': 'Trip Patterns by Day & Hour',
+    'daily_volume': 'Daily Trip Volume',
+    'trip_distance_analysis': 'Average Trip Distance by Group Size',
+    'location_comparison': 'Pickup vs Drop-off Comparison',
+    'peak_patterns': 'Peak Hours by Group Size Category'
+}
+
+NO_TRIPS_MESSAGE = "No trips match the selected filters"
+
+# Used when callers do not bring their own cache
+_default_figure_cache = FigureCache()
+
+def chart_fingerprint(inputs: tuple) -> str:
+    """Digest a chart's inputs; equal digests mean the chart would come out the same."""
+    return hashlib.blake2b(pickle.dumps(inputs, protocol=pickle.HIGHEST_PROTOCOL), digest_size=16).hexdigest()
+
+def get_figures(data_processor: DataProcessor, names: List[str], figure_cache: FigureCache = None,
+                filters: Dict[str, Any] = None,
+                skip: Dict[str, str] = None) -> Tuple[Dict[str, Optional[go.Figure]], Dict[str, str]]:
+    """
+    Get dashboard charts for the given filters, along with a fingerprint of each chart's inputs.
+    
+    The filtered aggregates are computed once for all the charts, and a chart is
+    only built when no cached figure has the same inputs. Charts whose fingerprint
+    equals the one given in skip come back as None, so callers can leave them as shown.
+    """
+    figure_cache = figure_cache if figure_cache is not None else _default_figure_cache
+    filters = data_processor.active_filters(filters)
+    if filters and not data_processor.has_trip_table:
+        # There is no trip table to filter; say so rather than show unfiltered charts as filtered
+        aggregates, message = None, config.ERROR_MESSAGES['filters_unavailable']
+    else:
+        aggregates = data_processor.get_filtered_aggregates(filters)
+        message = None if aggregates.total_trips else NO_TRIPS_MESSAGE
+    
+    figures, fingerprints = {}, {}
+    for name in names:
+        inputs = CHART_INPUTS[name](aggregates) if aggregates is not None else (message,)
+        fingerprints[name] = chart_fingerprint(inputs)
+        if skip and skip.get(name) == fingerprints[name]:
+            figures[name] = None
+            continue
+        if message is None:
+            build = lambda: downsample_figure(CHART_BUILDERS[name](*inputs))
+        else:
+            build = lambda: create_placeholder_chart(CHART_TITLES[name], message)
+        figures[name] = figure_cache.get_or_build(name, {'inputs': fingerprints[name]},
+                                                  data_processor.data_version, build)
+    return figures, fingerprints
+
+def get_figure(data_processor: DataProcessor, name: str, figure_cache: FigureCache = None,
+               params: Dict[str, Any] = None) -> go.Figure:
+    """
+    Get one dashboard chart for the given filters, building it only on the first request for its inputs.
+    """
+    figures, _ = get_figures(data_processor, [name], figure_cache, params)
+    return figures[name]
+
+def create_visualizations(data_processor: DataProcessor, figure_cache: FigureCache = None) -> Dict[str, Any]:
     """
     Create all visualizations for the Fetii dashboard.
     """
-    insights = data_processor.get_quick_insights()
-    df = data_processor.df
-    
-    visualizations = {}
+    figures, _ = get_figures(data_processor, list(CHART_BUILDERS), figure_cache)
+    return figures
+
+def downsample_figure(fig: go.Figure, max_points: int = None) -> go.Figure:
+    """
+    Cap the points each scatter trace ships to the browser.
     
-    # Core visualizations
-    visualizations['hourly_distribution'] = create_hourly_chart(insights['hourly_distribution'])
-    visualizations['group_size_distribution'] = create_group_size_chart(insights['group_size_distribution'])
-    visualizations['popular_locations'] = create_locations_chart(insights['top_pickups'])
+    Line traces are thinned with LTTB (keeping their peaks); marker-only point
+    clouds are binned onto a grid. When anything was dropped, the point counts
+    and reduction ratio are reported in fig.layout.meta['downsampling'].
+    """
+    limit = config.PERFORMANCE['max_rows_for_visualization'] if max_points is None else max_points
+    original_points = shown_points = 0
+    
+    for trace in fig.data:
+        if trace.type not in ('scatter', 'scattergl') or trace.x is None or trace.y is None:
+            continue
+        
+        num_points = len(trace.y)
+        original_points += num_points
+        if num_points > limit:
+            if 'lines' in (trace.mode or 'lines'):
+                keep = lttb_indices(_numeric_axis(trace.x), np.asarray(trace.y, dtype=float), limit)
+                _take_points(trace, keep, num_points)
+            else:
+                x_centers, y_centers, counts = bin_points(_numeric_axis(trace.x),
+                                                          np.asarray(trace.y, dtype=float), limit)
+                trace.update(x=x_centers, y=y_centers, text=None, hovertext=None, customdata=None,
+                             marker=dict(color=counts, size=None))
+        shown_points += len(trace.y)
+    
+    if shown_points < original_points:
+        fig.update_layout(meta={'downsampling': {
+            'original_points': original_points,
+            'shown_points': shown_points,
+            'reduction_ratio': round(original_points / shown_points, 2)
+        }})
     
-    # Advanced visualizations
-    visualizations['time_heatmap'] = create_time_heatmap(df)
-    visualizations['daily_volume'] = create_daily_volume_chart(df)
-    visualizations['trip_distance_analysis'] = create_distance_analysis(df)
-    visualizations['location_comparison'] = create_location_comparison(df)
-    visualizations['peak_patterns'] = create_peak_patterns(df)
+    return fig
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Pick at most threshold points with Largest-Triangle-Three-Buckets.
     
-    return visualizations
+    The first and last points and the global minimum and maximum are always kept.
+    """
+    num_points = len(y)
+    if num_points <= threshold:
+        return np.arange(num_points)
+    
+    peaks = [int(np.nanargmax(y)), int(np.nanargmin(y))] if not np.all(np.isnan(y)) else []
+    num_buckets = max(threshold - 2 - len(peaks), 1)
+    bounds = np.append(np.linspace(1, num_points - 1, num_buckets + 1).astype(int), num_points)
+    
+    # Average of every bucket after the first, the final point counting as a bucket of its own
+    valid = ~np.isnan(y)
+    sizes = np.diff(bounds[1:])
+    avg_x = np.add.reduceat(x, bounds[1:-1]) / sizes
+    avg_y = np.add.reduceat(np.where(valid, y, 0.0), bounds[1:-1]) / np.maximum(np.add.reduceat(valid, bounds[1:-1]), 1)
+    
+    selected = [0]
+    anchor = 0
+    for bucket in range(num_buckets):
+        start, end = bounds[bucket], bounds[bucket + 1]
+        
+        # Keep the point forming the largest triangle with the last kept point and the next bucket's average
+        areas = np.abs((x[anchor] - avg_x[bucket]) * (y[start:end] - y[anchor]) -
+                       (x[anchor] - x[start:end]) * (avg_y[bucket] - y[anchor]))
+        anchor = start + int(np.argmax(np.nan_to_num(areas, nan=-1.0)))
+        selected.append(anchor)
+    selected.append(num_points - 1)
+    
+    return np.unique(np.array(selected + peaks))[:threshold]
+
+def bin_points(x: np.ndarray, y: np.ndarray, max_points: int):
+    """Bin a point cloud onto a grid of at most max_points cells, returning occupied cell centers and counts."""
+    side = max(int(np.sqrt(max_points)), 1)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    counts, x_edges, y_edges = np.histogram2d(x[valid], y[valid], bins=side)
+    x_index, y_index = np.nonzero(counts)
+    x_centers = (x_edges[x_index] + x_edges[x_index + 1]) / 2
+    y_centers = (y_edges[y_index] + y_edges[y_index + 1]) / 2
+    return x_centers, y_centers, counts[x_index, y_index]
+
+def _numeric_axis(values) -> np.ndarray:
+    """Get axis values as floats: datetimes as epoch ticks, categories as positions."""
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype(np.int64).astype(float)
+    if np.issubdtype(values.dtype, np.number):
+        return values.astype(float)
+    return np.arange(len(values), dtype=float)
+
+def _take_points(trace, keep: np.ndarray, num_points: int):
+    """Keep only the given points of a trace, in every per-point attribute."""
+    def subset(value):
+        if value is None or isinstance(value, str):
+            return value
+        values = np.asarray(value)
+        return values[keep] if values.ndim >= 1 and len(values) == num_points else value
+    
+    trace.update(x=subset(trace.x), y=subset(trace.y), text=subset(trace.text),
+                 hovertext=subset(trace.hovertext), customdata=subset(trace.customdata))
+    trace.marker.size = subset(trace.marker.size)
+    trace.marker.color = subset(trace.marker.color)
+    trace.error_y.array = subset(trace.error_y.array)
 
 def create_hourly_chart(hourly_data: Dict[int, int]) -> go.Figure:
     """Create modern hourly distribution chart."""
+    if not hourly_data:
+        return create_placeholder_chart("Trip Distribution by Hour", NO_TRIPS_MESSAGE)
+    
     hours = sorted(hourly_data.keys())
     counts = [hourly_data[hour] for hour in hours]
     
@@ -163,6 +348,9 @@ def create_group_size_chart(group_data: Dict[int, int]) -> go.Figure:
 
 def create_locations_chart(pickup_data: list) -> go.Figure:
     """Create modern popular locations chart."""
+    if not pickup_data:
+        return create_placeholder_chart("Top Pickup Locations", NO_TRIPS_MESSAGE)
+    
     locations = [item[0] for item in pickup_data[:8]]
     counts = [item[1] for item in pickup_data[:8]]
     
@@ -228,14 +416,9 @@ def create_locations_chart(pickup_data: list) -> go.Figure:
     
     return fig
 
-def create_time_heatmap(df: pd.DataFrame) -> go.Figure:
+def create_time_heatmap(cube: TripCube) -> go.Figure:
     """Create advanced time-based heatmap."""
-    df_copy = df.copy()
-    df_copy['day_num'] = df_copy['datetime'].dt.dayofweek
-    df_copy['day_name'] = df_copy['datetime'].dt.day_name()
-    
-    heatmap_data = df_copy.groupby(['day_num', 'hour']).size().reset_index(name='trips')
-    heatmap_pivot = heatmap_data.pivot(index='day_num', columns='hour', values='trips').fillna(0)
+    day_hour_counts = cube.counts.sum(axis=2)
     
     day_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
     
@@ -253,7 +436,7 @@ def create_time_heatmap(df: pd.DataFrame) -> go.Figure:
     fig = go.Figure()
     
     fig.add_trace(go.Heatmap(
-        z=heatmap_pivot.values,
+        z=day_hour_counts,
         x=hour_labels,
         y=day_names,
         colorscale=[
@@ -288,11 +471,13 @@ def create_time_heatmap(df: pd.DataFrame) -> go.Figure:
     
     return fig
 
-def create_daily_volume_chart(df: pd.DataFrame) -> go.Figure:
+def create_daily_volume_chart(daily_counts: Dict[Any, int]) -> go.Figure:
     """Create modern daily trip volume chart."""
-    daily_trips = df.groupby('date').size().reset_index(name='trips')
-    daily_trips['date'] = pd.to_datetime(daily_trips['date'])
-    daily_trips = daily_trips.sort_values('date')
+    daily_trips = pd.DataFrame({
+        'date': pd.to_datetime(pd.Series(list(daily_counts.keys()), dtype=object)),
+        'trips': pd.Series(list(daily_counts.values()), dtype=np.int64)
+    })
+    daily_trips = daily_trips.sort_values('date', ignore_index=True)
     
     fig = go.Figure()
     
@@ -357,18 +542,20 @@ def create_daily_volume_chart(df: pd.DataFrame) -> go.Figure:
     
     return fig
 
-def create_distance_analysis(df: pd.DataFrame) -> go.Figure:
-    """Create group size vs trip distance analysis."""
-    if not all(col in df.columns for col in ['Pick Up Latitude', 'Pick Up Longitude', 'Drop Off Latitude', 'Drop Off Longitude']):
+def create_distance_analysis(distance_moments: Optional[Dict[int, tuple]]) -> go.Figure:
+    """Create group size vs trip distance analysis from per-group-size (count, mean, M2) moments."""
+    if distance_moments is None:
         return create_placeholder_chart("Distance Analysis", "Location data not available")
     
-    df_copy = df.copy()
-    df_copy['distance'] = np.sqrt(
-        (df_copy['Drop Off Latitude'] - df_copy['Pick Up Latitude'])**2 + 
-        (df_copy['Drop Off Longitude'] - df_copy['Pick Up Longitude'])**2
-    ) * 111  # Approximate km conversion
-    
-    distance_by_group = df_copy.groupby('Total Passengers')['distance'].agg(['mean', 'std', 'count']).reset_index()
+    sizes = sorted(distance_moments)
+    counts = np.array([distance_moments[size][0] for size in sizes], dtype=np.int64)
+    m2 = np.array([distance_moments[size][2] for size in sizes], dtype=float)
+    distance_by_group = pd.DataFrame({
+        'Total Passengers': np.array(sizes, dtype=np.int64),
+        'mean': np.array([distance_moments[size][1] for size in sizes], dtype=float),
+        'std': np.sqrt(np.divide(m2, counts - 1, out=np.full(len(sizes), np.nan), where=counts > 1)),
+        'count': counts
+    })
     distance_by_group = distance_by_group[distance_by_group['count'] >= 3]  # Filter groups with few trips
     
     fig = go.Figure()
@@ -412,16 +599,16 @@ def create_distance_analysis(df: pd.DataFrame) -> go.Figure:
     
     return fig
 
-def create_location_comparison(df: pd.DataFrame) -> go.Figure:
-    """Create pickup vs dropoff location comparison."""
-    pickup_counts = df['pickup_main'].value_counts().head(10)
-    dropoff_counts = df['dropoff_main'].value_counts().head(10)
+def create_location_comparison(top_pickups: list, top_dropoffs: list) -> go.Figure:
+    """Create pickup vs dropoff location comparison from the ranked top-10 location counts."""
+    pickup_counts = dict(top_pickups[:10])
+    dropoff_counts = dict(top_dropoffs[:10])
     
     # Get common locations
-    common_locations = list(set(pickup_counts.index) & set(dropoff_counts.index))
+    common_locations = list(set(pickup_counts) & set(dropoff_counts))
     if not common_locations:
         # If no common locations, take top 5 from each
-        all_locations = list(set(list(pickup_counts.index[:5]) + list(dropoff_counts.index[:5])))
+        all_locations = list(set(list(pickup_counts)[:5] + list(dropoff_counts)[:5]))
     else:
         all_locations = common_locations[:8]
     
@@ -481,29 +668,23 @@ def create_location_comparison(df: pd.DataFrame) -> go.Figure:
     
     return fig
 
-def create_peak_patterns(df: pd.DataFrame) -> go.Figure:
+def create_peak_patterns(cube: TripCube) -> go.Figure:
     """Create peak hours analysis by group size category."""
-    df_copy = df.copy()
-    df_copy['group_category'] = df_copy['Total Passengers'].apply(
-        lambda x: 'Small (1-4)' if x <= 4 else
-                  'Medium (5-8)' if x <= 8 else
-                  'Large (9-12)' if x <= 12 else
-                  'Extra Large (13+)'
-    )
-    
-    hourly_by_group = df_copy.groupby(['group_category', 'hour']).size().reset_index(name='trips')
+    hour_by_passengers = cube.counts.sum(axis=0)
     
     fig = go.Figure()
     
     colors = ['#3b82f6', '#10b981', '#f59e0b', '#ef4444']
     categories = ['Small (1-4)', 'Medium (5-8)', 'Large (9-12)', 'Extra Large (13+)']
+    passenger_slices = [slice(0, 5), slice(5, 9), slice(9, 13), slice(13, None)]
     
     for i, category in enumerate(categories):
-        data = hourly_by_group[hourly_by_group['group_category'] == category]
-        if not data.empty:
+        trips = hour_by_passengers[:, passenger_slices[i]].sum(axis=1)
+        hours = np.flatnonzero(trips)
+        if len(hours):
             fig.add_trace(go.Scatter(
-                x=data['hour'],
-                y=data['trips'],
+                x=hours,
+                y=trips[hours],
                 mode='lines+markers',
                 name=category,
                 line=dict(color=colors[i], width=3, shape='spline'),